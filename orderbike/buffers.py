@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Classes to compute the buffers of the edges of a graph once and share them between the structures used for the coverage.
+"""
+
+import numpy as np
+import shapely
+
+
+class EdgeBuffers:
+    """
+    Buffers of all edges of a graph, computed with a single vectorized shapely operation, with the index of each edge in the array of buffers. Edges are also indexed with their nodes in the other order, since edges of subgraphs can have them this way.
+
+    Args:
+        G (networkx.Graph): Graph, with the geometry of the edges.
+        buff_size (float): Size of the buffer around the edges.
+    """
+
+    def __init__(self, G, buff_size):
+        self.buff_size = buff_size
+        self.edges = list(G.edges)
+        self.edge_index = {}
+        for idx, edge in enumerate(self.edges):
+            self.edge_index[edge] = idx
+            self.edge_index.setdefault((edge[1], edge[0], *edge[2:]), idx)
+        self.geoms = buffer_geometries(
+            [G.edges[edge]["geometry"] for edge in self.edges], buff_size
+        )
+
+    def ids(self, edges):
+        """Return the array of indices of the edges."""
+        return np.array(
+            [self.edge_index[tuple(edge)] for edge in edges], dtype=np.int64
+        )
+
+    def get(self, edges):
+        """Return the array of buffers of the edges."""
+        return self.geoms[self.ids(edges)]
+
+
+def buffer_geometries(geoms, buff_size):
+    """Return the array of buffers of the geometries."""
+    # Same resolution as shapely.Geometry.buffer
+    return shapely.buffer(geoms, buff_size, quad_segs=16)
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+Classes to keep values of the candidate edges between the steps of a growth instead of computing them again for each step.
+"""
+
+import numpy as np
+import shapely
+
+
+class SpatialCache:
+    """
+    Values of the candidate edges kept between the steps of a growth, for values depending only on the edges whose buffers intersect the buffer of the candidate, such as the area gained or lost with an edge for the coverage. An STRtree of the buffers of all edges of the final graph finds the neighbors of each chosen step, whose values are removed, the values of the other edges staying exact.
+
+    Args:
+        buffers (buffers.EdgeBuffers): Buffers of the edges of the final graph.
+    """
+
+    def __init__(self, buffers):
+        self.buffers = buffers
+        self.tree = shapely.STRtree(buffers.geoms)
+        self.values = {}
+
+    def get(self, edges, func):
+        """Return the array of values of the edges, computing with func, returning the values of a list of edges, only the ones not kept."""
+        missing = [edge for edge in edges if edge not in self.values]
+        if missing:
+            self.values.update(zip(missing, func(missing)))
+        return np.array([self.values[edge] for edge in edges], dtype=float)
+
+    def invalidate(self, step):
+        """Remove the values of the edges whose buffer intersects the buffer of the chosen step."""
+        step_buffer = self.buffers.get([step])[0]
+        for idx in self.tree.query(step_buffer, predicate="intersects"):
+            self.values.pop(self.buffers.edges[idx], None)
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Classes to maintain the connected components of a graph during an additive growth instead of computing them again for each step.
+"""
+
+
+class ComponentLengths:
+    """
+    Union-find of the nodes of a graph growing by adding edges, keeping the total length of the edges of each connected component. Only the nodes of the added edges are in a component, as in the edge subgraph of the added edges.
+
+    Args:
+        G (networkx.Graph): Final graph.
+        edges (list, optional): Edges added at the start. Defaults to ().
+        weight (str, optional): Edge attribute used as length. Defaults to "length".
+    """
+
+    def __init__(self, G, edges=(), weight="length"):
+        self.G = G
+        self.weight = weight
+        self.parent = {}
+        self.lengths = {}
+        self.num_components = 0
+        self.max_length = 0
+        for edge in edges:
+            self.add(edge)
+
+    def find(self, node):
+        """Return the root of the component of node, compressing the path to it."""
+        root = node
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[node] != root:
+            self.parent[node], node = root, self.parent[node]
+        return root
+
+    def _add_node(self, node):
+        if node not in self.parent:
+            self.parent[node] = node
+            self.lengths[node] = 0
+            self.num_components += 1
+
+    def add(self, edge):
+        """Add an edge, merging the components of its nodes."""
+        u, v = edge[0], edge[1]
+        self._add_node(u)
+        self._add_node(v)
+        root_u, root_v = self.find(u), self.find(v)
+        if root_u != root_v:
+            # Merge the smaller component into the larger one
+            if self.lengths[root_u] < self.lengths[root_v]:
+                root_u, root_v = root_v, root_u
+            self.parent[root_v] = root_u
+            self.lengths[root_u] += self.lengths.pop(root_v)
+            self.num_components -= 1
+        self.lengths[root_u] += self.G.edges[edge][self.weight]
+        self.max_length = max(self.max_length, self.lengths[root_u])
@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+"""
+Functions and classes to keep track of the valid edges to add or remove during the growth of a graph when keeping it connected.
+"""
+
+from collections import deque
+
+import networkx as nx
+
+
+class SubtractiveConnectivity:
+    """
+    Keep track of the edges that can be removed from a graph without creating a new, unacceptable component. A new component is unacceptable if it doesn't have a built part. Only bridges whose both ends are not leaves can create a new component, so all of them are found with a single depth-first search on the actual graph, which is updated in place when an edge is removed.
+
+    Args:
+        G (networkx.Graph): Graph on which we want to remove edges.
+        built (bool, optional): If True, there is a built component to the graph to take into account. This is represented by an edge attribute on all edges, that is 1 if it's built, 0 if it's not built. Defaults to True.
+    """
+
+    def __init__(self, G, built=True):
+        self.built = built
+        # Keep the order of the edges of G to return valid edges in the same order
+        self._edges = {edge: None for edge in G.edges}
+        self._adj = {node: {} for node in G.nodes}
+        self._degree = {node: 0 for node in G.nodes}
+        # Number of built edges adjacent to each node, a node with one is in a component with a built part
+        self._built_degree = {node: 0 for node in G.nodes}
+        self._built_edges = {}
+        for edge in self._edges:
+            self._add_to_adjacency(edge)
+            if built and G.edges[edge]["built"] == 1:
+                self._built_edges[edge] = None
+                for node in set(edge[:2]):
+                    self._built_degree[node] += 1
+        # Number of components without a built part, while there is one no new component can be created
+        self._num_missing = 0
+        if built:
+            seen = set()
+            for node in self._adj:
+                if node not in seen:
+                    comp = self._search(node)
+                    seen.update(comp)
+                    if not any(self._built_degree[other] > 0 for other in comp):
+                        self._num_missing += 1
+
+    def _add_to_adjacency(self, edge):
+        u, v = edge[:2]
+        self._adj[u][edge] = v
+        self._adj[v][edge] = u
+        self._degree[u] += 1
+        self._degree[v] += 1
+
+    def update(self, step):
+        """
+        Remove the chosen step from the graph, and remove its nodes if they are isolated.
+
+        Returns:
+            list: Edges that were maybe invalid before and can now be valid. A bridge stays a bridge and a new component can only lose built nodes when removing edges, so an invalid edge can only become valid when one of its nodes becomes a leaf, or when the last component without a built part disappears.
+        """
+        step = self._key(step)
+        self._edges.pop(step)
+        u, v = step[:2]
+        for node in (u, v):
+            self._adj[node].pop(step, None)
+            self._degree[node] -= 1
+        step_built = step in self._built_edges
+        if step_built:
+            self._built_edges.pop(step)
+            for node in set(step[:2]):
+                self._built_degree[node] -= 1
+        woken = []
+        isolated = 0
+        for node in set(step[:2]):
+            if self._degree[node] == 0:
+                self._adj.pop(node)
+                self._degree.pop(node)
+                self._built_degree.pop(node)
+                isolated += 1
+            elif self._degree[node] == 1:
+                woken += list(self._adj[node])
+        # The step was the only edge of a component without a built part
+        if self.built and not step_built and isolated == len(set(step[:2])):
+            self._num_missing -= 1
+            if self._num_missing == 0:
+                return list(self._edges)
+        return woken
+
+    def _key(self, edge):
+        """Return the edge as found in the graph, since the edge can be given in the reverse direction."""
+        edge = tuple(edge)
+        if edge in self._edges:
+            return edge
+        return (edge[1], edge[0], *edge[2:])
+
+    def _search(self, source, excluded=None, stop=None):
+        """Return the set of nodes reachable from source without using the excluded edge, stopping early at the first node for which stop is True."""
+        seen = {source}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            if stop is not None and stop(node):
+                break
+            for edge, other in self._adj[node].items():
+                if edge != excluded and other not in seen:
+                    seen.add(other)
+                    queue.append(other)
+        return seen
+
+    def _bridge_side(self, edge):
+        """Search alternately from both ends of the edge without using it. Return None if both searches meet, else the edge is a bridge and return the nodes of the side fully explored first."""
+        seen = ({edge[0]}, {edge[1]})
+        queues = (deque([edge[0]]), deque([edge[1]]))
+        while True:
+            for side in (0, 1):
+                if not queues[side]:
+                    return seen[side]
+                node = queues[side].popleft()
+                for other_edge, other in self._adj[node].items():
+                    if other_edge == edge or other in seen[side]:
+                        continue
+                    if other in seen[1 - side]:
+                        return None
+                    seen[side].add(other)
+                    queues[side].append(other)
+
+    def is_valid(self, edge):
+        """Return True if the edge can be removed, looking only at the part of the graph needed to know if it is an unacceptable bridge, see _unacceptable_bridges."""
+        edge = self._key(edge)
+        if edge in self._built_edges:
+            return False
+        u, v = edge[:2]
+        if u == v or self._degree[u] == 1 or self._degree[v] == 1:
+            return True
+        side = self._bridge_side(edge)
+        if side is None:
+            return True
+        if not self.built or self._num_missing > 0:
+            return False
+        if not any(self._built_degree[node] > 0 for node in side):
+            return False
+        other = v if u in side else u
+        return any(
+            self._built_degree[node] > 0
+            for node in self._search(
+                other, excluded=edge, stop=lambda node: self._built_degree[node] > 0
+            )
+        )
+
+    def invalid_edges(self):
+        """Return the list of invalid edges, with the built edges first, in the same order as get_subtractive_invalid_edges."""
+        splitting = self._unacceptable_bridges()
+        invalid_edges = list(self._built_edges)
+        invalid_edges += [edge for edge in self._edges if edge in splitting]
+        return invalid_edges
+
+    def valid_edges(self):
+        """Return the list of edges that can be removed, in the order of the edges of the graph."""
+        splitting = self._unacceptable_bridges()
+        return [
+            edge
+            for edge in self._edges
+            if edge not in splitting and edge not in self._built_edges
+        ]
+
+    def _unacceptable_bridges(self):
+        """
+        Find with a single iterative depth-first search all the bridges that would split a component into two components without leaving an isolated node, and keep the ones where one of the components would have no built part.
+
+        Returns:
+            set: Set of edges that can't be removed.
+        """
+        disc = {}
+        low = {}
+        # Number of nodes adjacent to a built edge in the DFS subtree of each node
+        sub_built = {}
+        # For each component, its bridges with the node at their child end, and its number of nodes adjacent to a built edge
+        bridges = []
+        for root in self._adj:
+            if root in disc:
+                continue
+            comp_bridges = []
+            disc[root] = low[root] = len(disc)
+            sub_built[root] = int(self._built_degree[root] > 0)
+            # Stack of (node, edge used to reach it, iterator over its adjacency)
+            stack = [(root, None, iter(self._adj[root].items()))]
+            while stack:
+                node, parent_edge, neighbors = stack[-1]
+                for edge, other in neighbors:
+                    if edge == parent_edge or other == node:
+                        continue
+                    if other in disc:
+                        low[node] = min(low[node], disc[other])
+                    else:
+                        disc[other] = low[other] = len(disc)
+                        sub_built[other] = int(self._built_degree[other] > 0)
+                        stack.append((other, edge, iter(self._adj[other].items())))
+                        break
+                else:
+                    stack.pop()
+                    if stack:
+                        parent = stack[-1][0]
+                        low[parent] = min(low[parent], low[node])
+                        sub_built[parent] += sub_built[node]
+                        if low[node] > disc[parent]:
+                            comp_bridges.append((parent_edge, node))
+            bridges.append((comp_bridges, sub_built[root]))
+        # Any component without a built part makes every new component unacceptable
+        missing_built = any(total_built == 0 for _, total_built in bridges)
+        unacceptable = set()
+        for comp_bridges, total_built in bridges:
+            for edge, child in comp_bridges:
+                # Bridges with a leaf don't create a new component since the leaf is removed
+                if any(self._degree[node] == 1 for node in edge[:2]):
+                    continue
+                if self.built:
+                    # Built edges are already invalid
+                    if edge in self._built_edges:
+                        continue
+                    # Valid only if both new components have a built part
+                    side_built = sub_built[child]
+                    if (
+                        not missing_built
+                        and side_built > 0
+                        and total_built - side_built > 0
+                    ):
+                        continue
+                unacceptable.add(edge)
+        return unacceptable
+
+
+class AdditiveFrontier:
+    """
+    Keep track of the edges that can be added to a graph without creating a new, unacceptable component. Valid edges are the ones adjacent to the actual graph, and the ones of the only component of the final graph not touched by the actual graph when a new component can still be created. The frontier is updated in O(degree) when an edge is added.
+
+    Args:
+        G_final (networkx.Graph): Final graph, from where we find potential edges that can be added to the actual graph.
+        G_actual (networkx.Graph): Initial graph on which we want to add edges.
+    """
+
+    def __init__(self, G_final, G_actual):
+        # Rank of the edges in the final graph to return valid edges in the same order
+        self._rank = {edge: idx for idx, edge in enumerate(G_final.edges)}
+        self._adj = {node: [] for node in G_final.nodes}
+        for edge in self._rank:
+            u, v = edge[:2]
+            self._adj[u].append(edge)
+            if v != u:
+                self._adj[v].append(edge)
+        # Final component of each node, and edges of each final component
+        self._final_comp = {}
+        self._comp_edges = []
+        for comp_id, comp in enumerate(nx.connected_components(G_final)):
+            for node in comp:
+                self._final_comp[node] = comp_id
+            self._comp_edges.append([])
+        for edge in self._rank:
+            self._comp_edges[self._final_comp[edge[0]]].append(edge)
+        self._untouched = set(range(len(self._comp_edges)))
+        self._actual_edges = set()
+        self._parent = {}
+        self._num_cc = 0
+        self._frontier = set()
+        for edge in G_actual.edges:
+            self.update(edge)
+
+    def _key(self, edge):
+        """Return the edge as found in the final graph, since the edge can be given in the reverse direction."""
+        edge = tuple(edge)
+        if edge in self._rank:
+            return edge
+        return (edge[1], edge[0], *edge[2:])
+
+    def _find(self, node):
+        while self._parent[node] != node:
+            self._parent[node] = self._parent[self._parent[node]]
+            node = self._parent[node]
+        return node
+
+    def update(self, step):
+        """
+        Add the chosen step to the actual graph and the edges adjacent to its new nodes to the frontier.
+
+        Returns:
+            list: Edges that were maybe invalid before and can now be valid, the new edges of the frontier and the edges of the last untouched final component if a new component can now be created.
+        """
+        was_open = self._is_open()
+        step = self._key(step)
+        self._actual_edges.add(step)
+        self._frontier.discard(step)
+        woken = []
+        for node in step[:2]:
+            if node not in self._parent:
+                self._parent[node] = node
+                self._num_cc += 1
+                self._untouched.discard(self._final_comp[node])
+                new_edges = [
+                    edge for edge in self._adj[node] if edge not in self._actual_edges
+                ]
+                self._frontier.update(new_edges)
+                woken += new_edges
+        root_u, root_v = self._find(step[0]), self._find(step[1])
+        if root_u != root_v:
+            self._parent[root_u] = root_v
+            self._num_cc -= 1
+        if not was_open and self._is_open():
+            (comp_id,) = self._untouched
+            woken += self._comp_edges[comp_id]
+        return woken
+
+    def _is_open(self):
+        """Return True if a new component can be created, which is only possible on the last final component not on the actual graph."""
+        return self._num_cc < len(self._comp_edges) and len(self._untouched) == 1
+
+    def is_valid(self, edge):
+        """Return True if the edge can be added."""
+        edge = self._key(edge)
+        if edge in self._frontier:
+            return True
+        return self._is_open() and self._final_comp[edge[0]] in self._untouched
+
+    def valid_edge_set(self):
+        """Return the set of edges that can be added."""
+        if self._is_open():
+            (comp_id,) = self._untouched
+            return self._frontier.union(self._comp_edges[comp_id])
+        return self._frontier
+
+    def valid_edges(self):
+        """Return the list of edges that can be added, in the order of the edges of the final graph."""
+        return sorted(self.valid_edge_set(), key=self._rank.__getitem__)
+
+    def invalid_edges(self):
+        """Return the list of invalid edges, in the same order as get_additive_invalid_edges."""
+        valid_edges = self.valid_edge_set()
+        return [edge for edge in self._rank if edge not in valid_edges]
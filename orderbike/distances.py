@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Classes to maintain the matrix of shortest network path lengths of a graph during its growth instead of computing it again for each tested graph.
+"""
+
+import numpy as np
+
+
+class _Distances:
+    """
+    Matrix of shortest network path length between all nodes of the final graph, using only the edges of the actual graph, with infinite distances for nodes not in the actual graph. The row of a node is the distances from this node as a source.
+
+    The state of the growth is given to each method instead of being kept, so that the matrix can be copied to other processes with the pre-computed values.
+
+    Args:
+        state (GrowthState): State of the growth, with the initial edges.
+    """
+
+    def __init__(self, state):
+        num_nodes = len(state.nodes)
+        self.matrix = np.full((num_nodes, num_nodes), np.inf)
+        np.fill_diagonal(self.matrix, 0.0)
+        node_ids = state.node_ids()
+        self.matrix[np.ix_(node_ids, node_ids)] = state.shortest_path_length_matrix()
+
+
+class IncrementalDistances(_Distances):
+    """
+    Distances maintained during an additive growth. Adding an edge (u, v) of length w can only shorten paths going through it, so the new matrix is min(D, D[:, u] + w + D[v, :], D[:, v] + w + D[u, :]), computed with a single broadcast. Nodes not in the actual graph have infinite distances to all other nodes, so edges reaching new nodes don't need a special case.
+    """
+
+    def _through_edge(self, state, edge_id, node_ids):
+        """Return the matrix between node_ids after adding the edge."""
+        u, v = state.edge_nodes[edge_id]
+        w = state.weights[edge_id]
+        du = self.matrix[node_ids, u]
+        dv = self.matrix[node_ids, v]
+        through = np.minimum(
+            du[:, None] + w + dv[None, :], dv[:, None] + w + du[None, :]
+        )
+        return np.minimum(self.matrix[np.ix_(node_ids, node_ids)], through)
+
+    def tested_matrix(self, state):
+        """
+        Get the matrix of shortest network path length of the tested graph of the state, see GrowthState.shortest_path_length_matrix.
+
+        Returns:
+            numpy.array: Matrix with a shape (N, N), with N being the number of nodes of the tested graph, in the order of the nodes of the final graph.
+        """
+        node_ids = state.node_ids(tested=True)
+        if state.tested < 0 or state.present[state.tested]:
+            return self.matrix[np.ix_(node_ids, node_ids)]
+        return self._through_edge(state, state.tested, node_ids)
+
+    def apply(self, state, step):
+        """Add the chosen step to the matrix."""
+        edge_id = state.edge_index[tuple(step)]
+        u, v = state.edge_nodes[edge_id]
+        w = state.weights[edge_id]
+        du = self.matrix[:, u].copy()
+        dv = self.matrix[:, v].copy()
+        np.minimum(self.matrix, du[:, None] + w + dv[None, :], out=self.matrix)
+        np.minimum(self.matrix, dv[:, None] + w + du[None, :], out=self.matrix)
+
+
+class DecrementalDistances(_Distances):
+    """
+    Distances maintained during a subtractive growth. Removing an edge (u, v) of length w only changes the distances of the pairs (s, t) whose shortest paths go through it, where D[s, u] + w + D[v, t] or D[s, v] + w + D[u, t] is equal to D[s, t] up to rounding errors. Only these pairs are computed again, by relaxing their distances through their neighbors until nothing changes, with the same floating point sums as in the Dijkstra algorithm, so the matrix is exactly the one of GrowthState.shortest_path_length_matrix.
+
+    Args:
+        state (GrowthState): State of the growth, with the initial edges.
+        rtol (float, optional): Relative tolerance to find the pairs whose shortest paths can go through the removed edge, large enough to include all of them despite rounding errors. Defaults to 1e-9.
+    """
+
+    def __init__(self, state, rtol=1e-9):
+        super().__init__(state)
+        self.rtol = rtol
+
+    def _removed(self, state, edge_id, node_ids, edge_ids):
+        """Return the matrix between node_ids of the graph made of the edges edge_ids, once the edge is removed."""
+        mat = self.matrix[np.ix_(node_ids, node_ids)]
+        u, v = np.searchsorted(node_ids, state.edge_nodes[edge_id])
+        w = state.weights[edge_id]
+        bound = mat * (1 + self.rtol)
+        affected = (mat[:, u, None] + w + mat[None, v, :] <= bound) | (
+            mat[:, v, None] + w + mat[None, u, :] <= bound
+        )
+        rows, cols = np.nonzero(affected & np.isfinite(mat))
+        if len(rows) == 0:
+            return mat
+        mat[rows, cols] = np.inf
+        # Adjacency of the graph between node_ids, as in GrowthState._build_csr
+        relabel = np.full(len(state.nodes), -1, dtype=np.int64)
+        relabel[node_ids] = np.arange(len(node_ids))
+        ends = relabel[state.edge_nodes[edge_ids]]
+        src = np.concatenate([ends[:, 0], ends[:, 1]])
+        sorter = np.argsort(src, kind="stable")
+        neighbors = np.concatenate([ends[:, 1], ends[:, 0]])[sorter]
+        weights = np.concatenate([state.weights[edge_ids], state.weights[edge_ids]])[
+            sorter
+        ]
+        indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=len(node_ids)), out=indptr[1:])
+        # One entry for each neighbor of the target of each affected pair
+        counts = indptr[cols + 1] - indptr[cols]
+        starts = np.cumsum(counts) - counts
+        pos = np.repeat(indptr[cols] - starts, counts) + np.arange(counts.sum())
+        pair_rows = np.repeat(rows, counts)
+        has_neighbors = counts > 0
+        while True:
+            vals = mat[pair_rows, neighbors[pos]] + weights[pos]
+            new = np.full(len(rows), np.inf)
+            if len(vals) > 0:
+                new[has_neighbors] = np.minimum.reduceat(vals, starts[has_neighbors])
+            if np.array_equal(new, mat[rows, cols]):
+                return mat
+            mat[rows, cols] = new
+
+    def tested_matrix(self, state):
+        """
+        Get the matrix of shortest network path length of the tested graph of the state, see GrowthState.shortest_path_length_matrix.
+
+        Returns:
+            numpy.array: Matrix with a shape (N, N), with N being the number of nodes of the tested graph, in the order of the nodes of the final graph.
+        """
+        node_ids = state.node_ids(tested=True)
+        if state.tested >= 0 and state.present[state.tested]:
+            return self._removed(
+                state, state.tested, node_ids, state.edge_ids(tested=True)
+            )
+        return self.matrix[np.ix_(node_ids, node_ids)]
+
+    def apply(self, state, step):
+        """Remove the chosen step from the matrix, once removed from the state."""
+        edge_id = state.edge_index[tuple(step)]
+        # Nodes of the step removed from the state are kept until the distances are updated
+        node_ids = np.union1d(state.node_ids(), state.edge_nodes[edge_id])
+        self.matrix[np.ix_(node_ids, node_ids)] = self._removed(
+            state, edge_id, node_ids, state.edge_ids()
+        )
@@ -3,13 +3,29 @@
 Functions to make subtractive or additive growth of a graph.
 """
 
+import contextlib
+import heapq
+import multiprocessing
+
 import tqdm
 
 import networkx as nx
 import numpy as np
-import shapely
 
 from . import metrics
+from .buffers import EdgeBuffers
+from .components import ComponentLengths
+from .connectivity import AdditiveFrontier, SubtractiveConnectivity
+from .distances import IncrementalDistances
+from .parallel import CandidateEvaluator, get_n_jobs
+from .raster import RasterCoverage
+from .results import LazyMetrics
+from .state import (
+    GrowthState,
+    load_checkpoint,
+    save_checkpoint,
+)
+from .unions import BufferUnion
 from .utils import log
 
 __all__ = [
@@ -26,6 +42,7 @@ def order_ranked_network_growth(
     ranking_func=metrics.growth_random,
     save_metrics=True,
     buff_size_metrics=200,
+    seed=None,
     **kwargs,
 ):
     """
@@ -37,52 +54,33 @@ def order_ranked_network_growth(
         keep_connected (bool, optional): If True, the number of components of G will be as small as possible for all the growth, restricting the list of edges that can be added. Defaults to True.
         order (str, optional): Either subtractive or additive. Gives the order for the greedy optimization. The subtractive (resp. additive) start from the final (resp. initial) graph and remove (resp. add) edges until reaching the initial graph (resp. final). Defaults to "subtractive".
         ranking_func (function, optional): The function computing the ranking on G, in descending order. Defaults to metrics.growth_random.
-        save_metrics (bool, optional): If True, compute all the metrics on the graph for the growth and return it as a dictionary. Defaults to True.
+        save_metrics (bool or list, optional): If True, compute all the metrics on the graph for the growth and return it as a dictionary. If a list of names of metrics, only compute these metrics, see compute_metrics. Defaults to True.
         buff_size_metrics (int, optional): Size of the buffer in the computation of the metric for the growth. Defaults to 200.
+        seed (int, numpy.random.SeedSequence or numpy.random.Generator, optional): Seed of the random number generator used for the random ranking and to break ties. See utils.spawn_seeds to get seeds for multiple trials. If None, the growth is not reproducible. Defaults to None.
 
     Returns:
         list: Ordered list of edges. For subtractive (resp. additive) order, the first edge in the list is the last (resp. first) to add. If built is True, will only have edges with "built" != 1. Else, will have all edges of G except the seed.
     """
+    rng = np.random.default_rng(seed)
     init_edges = _init_edges(G, built, order)
-    absolute_ranking = ranking_func(G, **kwargs)
+    if ranking_func == metrics.growth_random:
+        absolute_ranking = ranking_func(G, rng=rng, **kwargs)
+    else:
+        absolute_ranking = ranking_func(G, **kwargs)
     # If keeping connected need to choose for the order the one with the highest/smallest ranking to add/remove
     if keep_connected:
-        order_growth = []
-        G_actual = _init_graph(G, order, init_edges)
+        state = GrowthState(G, order, init_edges)
+        G_actual = state.graph()
+        connectivity = _init_connectivity(G, G_actual, built, keep_connected, order)
         num_step = len(G.edges) - len(init_edges)
-        for i in range(num_step):
-            valid_edges = _valid_edges(
-                G, G_actual, init_edges, built, keep_connected, order
-            )
-            log.debug(f"Step {i}: {len(valid_edges)} valid edges to choose from.")
-            testing_ranking = absolute_ranking.copy()
-            sgn = 1
-            # In subtractive order, choose the edge with the lowest ranking, in additive the highest
-            if order == "subtractive":
-                testing_ranking.reverse()
-                sgn *= -1
-            if ranking_func == metrics.growth_random:
-                for edge in testing_ranking:
-                    if edge in valid_edges:
-                        step = edge
-                        absolute_ranking.remove(step)
-                        break
-            else:
-                valid_cases = [
-                    [edge, sgn * met]
-                    for edge, met in testing_ranking
-                    if edge in valid_edges
-                ]
-                valid_edges = [val[0] for val in valid_cases]
-                valid_mets = [val[1] for val in valid_cases]
-                step = _find_optimal_edge(valid_mets, valid_edges)
-                step_met = valid_mets[
-                    [idx for idx, i in enumerate(valid_edges) if i == step][0]
-                ]
-                absolute_ranking.remove([step, sgn * step_met])
-            log.debug(f"Step {i}: optimal edge chosen is {step}.")
-            G_actual = _update_actual_graph(G, G_actual, step, order)
-            order_growth.append(step)
+        if ranking_func == metrics.growth_random:
+            ranking, values = absolute_ranking, None
+        else:
+            ranking = [edge for edge, met in absolute_ranking]
+            values = [met for edge, met in absolute_ranking]
+        order_growth = _ranked_connected_growth(
+            ranking, values, state, connectivity, order, num_step, rng=rng
+        )
         if order == "subtractive":
             order_growth.reverse()
     else:
@@ -90,19 +88,90 @@ def order_ranked_network_growth(
             order_growth = [step for step in absolute_ranking if step not in init_edges]
         else:
             order_growth = [
-                step for met, step in absolute_ranking if step not in init_edges
+                step for step, met in absolute_ranking if step not in init_edges
             ]
         # Since in subtractive order without a built part we don't initialize edges, we need to remove the first edge of the ranking
         if order == "subtractive" and built is False:
             order_growth = order_growth[1:]
     if save_metrics:
         metrics_dict = compute_metrics(
-            G, order_growth, built=built, x_meter=True, buff_size=buff_size_metrics
+            G,
+            order_growth,
+            built=built,
+            x_meter=True,
+            buff_size=buff_size_metrics,
+            metrics=None if save_metrics is True else save_metrics,
         )
         return metrics_dict, order_growth
     return order_growth
 
 
+def _ranked_connected_growth(
+    ranking, values, state, connectivity, order, num_step, rng=None
+):
+    """
+    Find the order of growth following a static ranking while keeping the graph connected. The edges are in a heap keyed by their ranking, and at each step the best valid edge is popped. Invalid edges popped are set aside until the connectivity structure tells that they can be valid again, so that each step only checks the validity of a few edges instead of recomputing all valid edges.
+
+    Args:
+        ranking (list): Edges in descending order of ranking.
+        values (list): Values of the ranking of the edges, or None. If not None, ties between valid edges with the best value are broken at random with rng, else the valid edge with the best position in the ranking is chosen.
+        state (GrowthState): State of the growth.
+        connectivity (SubtractiveConnectivity or AdditiveFrontier): Structure keeping track of the valid edges.
+        order (str): Either subtractive or additive. In subtractive order the edge with the lowest ranking is chosen, in additive the highest.
+        num_step (int): Number of steps of the growth.
+        rng (numpy.random.Generator, optional): Random number generator to break ties. Defaults to None.
+
+    Returns:
+        list: Ordered list of the chosen edges, in the order they are chosen.
+    """
+    num_edges = len(ranking)
+    sgn = -1 if order == "subtractive" else 1
+    # Key of each edge, the opposite of its value, then its position when going through the ranking in the order of the growth
+    keys = []
+    for idx in range(num_edges):
+        position = num_edges - 1 - idx if order == "subtractive" else idx
+        val = -sgn * values[idx] if values is not None else 0
+        keys.append((val, position, idx))
+    heap = list(keys)
+    heapq.heapify(heap)
+    ranking_index = {
+        state.edge_index[tuple(edge)]: idx for idx, edge in enumerate(ranking)
+    }
+    # Edges popped while invalid, waiting to be pushed again
+    dormant = set()
+    order_growth = []
+    for i in range(num_step):
+        optimum = []
+        while heap and (not optimum or heap[0][0] == optimum[0][0]):
+            key = heapq.heappop(heap)
+            if connectivity.is_valid(ranking[key[2]]):
+                optimum.append(key)
+                if values is None:
+                    break
+            else:
+                dormant.add(key[2])
+        if not optimum:
+            raise ValueError(f"Step {i}: no valid edge to choose from.")
+        if len(optimum) > 1:
+            edges = [tuple(ranking[key[2]]) for key in optimum]
+            step = _find_optimal_edge([key[0] for key in optimum], edges, rng=rng)
+            chosen = edges.index(step)
+        else:
+            chosen = 0
+        for key in optimum[:chosen] + optimum[chosen + 1 :]:
+            heapq.heappush(heap, key)
+        step = ranking[optimum[chosen][2]]
+        log.debug(f"Step {i}: optimal edge chosen is {step}.")
+        state.apply(step)
+        for edge in connectivity.update(step):
+            idx = ranking_index.get(state.edge_index[edge])
+            if idx in dormant:
+                dormant.remove(idx)
+                heapq.heappush(heap, keys[idx])
+        order_growth.append(step)
+    return order_growth
+
+
 def order_dynamic_network_growth(
     G,
     built=True,
@@ -115,6 +184,15 @@ def order_dynamic_network_growth(
     progress_bar=True,
     save_metrics=True,
     buff_size_metrics=200,
+    n_jobs=1,
+    lazy=False,
+    batch_size=1,
+    batch_length=None,
+    checkpoint=None,
+    checkpoint_every=1,
+    resume_from=None,
+    seed=None,
+    memo=None,
     **kwargs,
 ):
     """
@@ -129,8 +207,17 @@ def order_dynamic_network_growth(
         metric_func (function, optional): The function computing the metric on G. Defaults to None.
         precomp_func (function, optional): A sister function to metric_func to compute values before the growth steps. Defaults to None.
         update_func (function, optional): A sister function to metric_func to update values at each steps. Defaults to None.
-        save_metrics (bool, optional): If True, compute all the metrics on the graph for the growth and return it as a dictionary. Defaults to True.
+        save_metrics (bool or list, optional): If True, compute all the metrics on the graph for the growth and return it as a dictionary. If a list of names of metrics, only compute these metrics, see compute_metrics. Defaults to True.
         buff_size_metrics (int, optional): Size of the buffer in the computation of the metric for the growth. Defaults to 200.
+        n_jobs (int, optional): Number of processes computing the metric on the valid edges at each step, -1 to use all CPUs. Each process receives the pre-computed values once and then only the chosen steps, so the functions and values need to be picklable. The chosen edges are the same as with a single process. Defaults to 1.
+        lazy (bool, optional): If True, use lazy greedy evaluation (CELF) for metrics whose value for an edge can only decrease during the growth, as coverage and adaptive coverage: only candidates whose previous value is an upper bound close to the maximum are evaluated again. Gives the same order as the exhaustive evaluation. Other metrics fall back to the exhaustive evaluation. Defaults to False.
+        batch_size (int, optional): Number of edges chosen after each computation of the metric on all valid edges. The edges are chosen one after the other in decreasing order of their metric value, if they are still valid after adding/removing the previous ones. Defaults to 1.
+        batch_length (float, optional): If not None, replace batch_size by a budget of length, choosing edges after each computation of the metric until the sum of their length reaches batch_length. Defaults to None.
+        checkpoint (str, optional): If not None, path of the file where the partial order of growth, the upper bounds of the lazy evaluation and the state of the random number generator are saved. The pre-computed values are not saved since they are rebuilt from the graph and the partial order when resuming. Defaults to None.
+        checkpoint_every (int, optional): Number of computations of the metric on all valid edges between two checkpoints. Defaults to 1.
+        resume_from (str, optional): If not None, path of a checkpoint file from where to continue the growth, giving the same result as without interruption. The other arguments need to be the same as for the interrupted growth. Defaults to None.
+        seed (int, numpy.random.SeedSequence or numpy.random.Generator, optional): Seed of the random number generator used to break ties. See utils.spawn_seeds to get seeds for multiple trials. If None, the growth is not reproducible. Defaults to None.
+        memo (trials.TieMemo, optional): If not None, memo of the optimal edges of the steps shared between trials with the same graph and arguments but different seeds, see trials.memoized_trials. The metric is only computed for steps not already in the memo. Only available with batch_size of 1. Defaults to None.
 
     Returns:
         list: Ordered list of edges. For subtractive (resp. additive) order, the first edge in the list is the last (resp. first) to add. If built is True, will only have edges with "built" != 1. Else, will have all edges of G except the seed.
@@ -140,90 +227,317 @@ def order_dynamic_network_growth(
         metric_func = metric_dict["metric_func"]
         precomp_func = metric_dict["precomp_func"]
         update_func = metric_dict["update_func"]
+        use_state = metric_dict["use_state"]
+        submodular = metric_dict["submodular"]
+        batch_func = metric_dict.get("batch_func")
     else:
+        batch_func = None
+        use_state = False
+        submodular = False
         if metric_func is None:
             raise ValueError(
                 "Plaise enter either a metric name or functions to compute growth"
             )
     order_growth = []
     init_edges = _init_edges(G, built, order)
-    G_actual = _init_graph(G, order, init_edges)
+    # The actual and tested graphs are views on G following the state of the growth
+    state = GrowthState(G, order, init_edges)
+    G_actual = state.graph()
+    H = state.graph(tested=True)
+    connectivity = _init_connectivity(G, G_actual, built, keep_connected, order)
+    shared = {"G": G, "G_actual": G_actual, "H": H, "state": state}
     num_step = len(G.edges) - len(init_edges)
-    total_step = range(num_step)
-    if progress_bar:
-        total_step = tqdm.tqdm(total_step)
+    rng = np.random.default_rng(seed)
+    # Upper bounds of the metric of each edge for the lazy evaluation
+    bounds = {}
+    i = 0
+    if use_state:
+        kwargs["state"] = state
     if precomp_func is not None:
         precomp_kwargs = precomp_func(G_actual, G, order, **kwargs)
     else:
         precomp_kwargs = kwargs
-    for i in total_step:
-        valid_edges = _valid_edges(
-            G, G_actual, init_edges, built, keep_connected, order
+    if resume_from is not None:
+        saved = load_checkpoint(resume_from)
+        if saved["order"] != order or saved["num_step"] != num_step:
+            raise ValueError(
+                f"Checkpoint {resume_from} is not from a growth with the same graph and order."
+            )
+        # Only the partial order is saved, the actual graph and the pre-computed values are rebuilt by applying its steps as during the growth
+        order_growth = saved["order_growth"]
+        for step in order_growth:
+            state.apply(step)
+            if connectivity is not None:
+                connectivity.update(step)
+            if update_func is not None:
+                precomp_kwargs = update_func(G, G_actual, step, **precomp_kwargs)
+        rng.bit_generator.state = saved["rng_state"]
+        bounds = saved["bounds"]
+        i = saved["sweep"]
+        log.info(f"Resuming growth from {resume_from} at step {len(order_growth)}.")
+    n_jobs = get_n_jobs(n_jobs)
+    if n_jobs > 1:
+        evaluator = CandidateEvaluator(
+            n_jobs,
+            G,
+            order,
+            init_edges,
+            metric_func,
+            update_func,
+            precomp_kwargs,
+            shared,
+            steps=order_growth,
+            batch_func=batch_func,
         )
-        log.debug(f"Step {i}: {len(valid_edges)} valid edges to choose from.")
+    else:
+        evaluator = contextlib.nullcontext()
+    if lazy and not submodular:
+        log.warning(
+            "Lazy evaluation is only valid for submodular metrics, using exhaustive evaluation instead."
+        )
+        lazy = False
+    if lazy and (batch_size > 1 or batch_length is not None):
+        log.warning(
+            "Lazy evaluation only finds the optimal edge, using exhaustive evaluation for batches instead."
+        )
+        lazy = False
+    if memo is not None and (batch_size > 1 or batch_length is not None):
+        log.warning(
+            "The memo of ties is only available for batches of a single edge, running without memo instead."
+        )
+        memo = None
+    if memo is not None:
+        node = memo.root
+        for step in order_growth:
+            node = memo.child(node, step)
+
+    def evaluate(edges):
+        """Remove/add each edge to the actual graph and compute the metric on it."""
+        if n_jobs > 1:
+            return evaluator.evaluate(edges)
+        if batch_func is not None:
+            return batch_func(G, edges, **precomp_kwargs)
         metric_vals = []
-        # Remove/add an edge to the actual graph and compute the metric on it
-        for edge in valid_edges:
-            H = _update_tested_graph(G_actual, G, edge, order)
+        for edge in edges:
+            state.test(edge)
             temp_m = metric_func(H, edge, **precomp_kwargs)
             metric_vals.append(temp_m)
-        # Choose the edge that gives the maximum value for the metric
-        step = _find_optimal_edge(metric_vals, valid_edges)
-        log.debug(f"Step {i}: optimal edge chosen is {step}.")
-        G_actual = _update_actual_graph(G, G_actual, step, order)
-        order_growth.append(step)
-        if update_func is not None:
-            precomp_kwargs = update_func(G, G_actual, step, **precomp_kwargs)
+        return metric_vals
+
+    pbar = tqdm.tqdm(
+        total=num_step, initial=len(order_growth), disable=not progress_bar
+    )
+    with evaluator, pbar:
+        while len(order_growth) < num_step:
+            valid_edges = _valid_edges(
+                G, G_actual, init_edges, built, keep_connected, order, connectivity
+            )
+            log.debug(f"Step {i}: {len(valid_edges)} valid edges to choose from.")
+            candidates = None
+            batch = []
+            # Choose edges in the batch while they are still valid and within the budget
+            while len(order_growth) < num_step:
+                if batch:
+                    if batch_length is not None:
+                        if (
+                            sum(G.edges[edge]["length"] for edge in batch)
+                            >= batch_length
+                        ):
+                            break
+                    elif len(batch) >= batch_size:
+                        break
+                    valid_edges = [
+                        edge
+                        for edge in _valid_edges(
+                            G,
+                            G_actual,
+                            init_edges,
+                            built,
+                            keep_connected,
+                            order,
+                            connectivity,
+                        )
+                        if edge in candidates
+                    ]
+                    if not valid_edges:
+                        break
+                # Choose the edge that gives the maximum value for the metric
+                # The metric is only computed if the optimal edges are not in the memo
+                optimum = memo.optimum(node) if memo is not None else None
+                if optimum is None:
+                    if lazy:
+                        optimum = _lazy_optimal_edges(valid_edges, evaluate, bounds)
+                    else:
+                        if candidates is None:
+                            candidates = dict(zip(valid_edges, evaluate(valid_edges)))
+                        optimum = _optimal_edges(
+                            [candidates[edge] for edge in valid_edges], valid_edges
+                        )
+                    if memo is not None:
+                        memo.record(node, optimum)
+                step = _choose_edge(optimum, rng=rng)
+                if memo is not None:
+                    node = memo.child(node, step)
+                log.debug(f"Step {i}: optimal edge chosen is {step}.")
+                batch.append(step)
+                state.apply(step)
+                if connectivity is not None:
+                    connectivity.update(step)
+                order_growth.append(step)
+                pbar.update(1)
+                if n_jobs > 1:
+                    evaluator.step(step)
+                if update_func is not None:
+                    buff_size = precomp_kwargs.get("buff_size")
+                    precomp_kwargs = update_func(G, G_actual, step, **precomp_kwargs)
+                    # Values with a different buffer size are not upper bounds anymore
+                    if lazy and precomp_kwargs.get("buff_size") != buff_size:
+                        log.debug("Buffer size changed, resetting lazy upper bounds.")
+                        bounds.clear()
+            i += 1
+            if checkpoint is not None and (
+                i % checkpoint_every == 0 or len(order_growth) == num_step
+            ):
+                save_checkpoint(
+                    checkpoint,
+                    {
+                        "order": order,
+                        "num_step": num_step,
+                        "sweep": i,
+                        "order_growth": order_growth,
+                        "rng_state": rng.bit_generator.state,
+                        "bounds": bounds,
+                    },
+                )
     if order == "subtractive":
         order_growth.reverse()
     if save_metrics:
         metrics_dict = compute_metrics(
-            G, order_growth, built=built, x_meter=True, buff_size=buff_size_metrics
+            G,
+            order_growth,
+            built=built,
+            x_meter=True,
+            buff_size=buff_size_metrics,
+            metrics=None if save_metrics is True else save_metrics,
         )
         return metrics_dict, order_growth
     return order_growth
 
 
-def _find_optimal_edge(vals, edges):
-    """Get the edge with the maximal value, if there are multiple ones with maximal value pick one of them at random."""
+def _find_optimal_edge(vals, edges, rng=None):
+    """Get the edge with the maximal value, if there are multiple ones with maximal value pick one of them at random with the random number generator rng, or a new one if None."""
+    return _choose_edge(_optimal_edges(vals, edges), rng=rng)
+
+
+def _optimal_edges(vals, edges):
+    """Return the list of the edges with the maximal value."""
     m = max(vals)
     log.debug(f"The maximum value is {m}, the minimum value is {min(vals)}")
-    optimum = [edge for edge, val in zip(edges, vals) if val == m]
+    return [edge for edge, val in zip(edges, vals) if val == m]
+
+
+def _choose_edge(optimum, rng=None):
+    """Return the optimal edge, picked at random with the random number generator rng, or a new one if None, if there are multiple ones."""
     # When more than one optimal value, return a random value from all the optimal ones
     if len(optimum) > 1:
         log.debug(f"{len(optimum)} steps are optimal, choosing one randomly")
-        rng = np.random.default_rng()
+        if rng is None:
+            rng = np.random.default_rng()
         # Need to change to list with built-in function to avoid numpy int type for values, and then to tuple for the list
         return tuple(rng.choice(optimum).tolist())
     return optimum[0]
 
 
+def _lazy_optimal_edges(valid_edges, evaluate, bounds, rtol=1e-9, atol=1e-9):
+    """
+    Get the edges with the maximal value with lazy greedy evaluation, for metrics where the value of an edge can only decrease during the growth. Only the edges whose previous value, an upper bound, is at the top of a max-heap are evaluated again, until an evaluated one stays at the top. All edges with an upper bound close to the maximum are evaluated to find the same ties as the exhaustive evaluation.
+
+    Args:
+        valid_edges (list): Edges to choose from.
+        evaluate (function): Function returning the list of values of the metric for a list of edges.
+        bounds (dict): Last value of the metric for each edge, updated in place.
+        rtol (float, optional): Relative tolerance on the maximum to evaluate edges again, to be robust to floating point errors. Defaults to 1e-9.
+        atol (float, optional): Absolute tolerance on the maximum to evaluate edges again. Defaults to 1e-9.
+
+    Returns:
+        list: Edges with the maximal value between the evaluated edges, as in _optimal_edges.
+    """
+    fresh = {}
+
+    def _evaluate_ids(ids):
+        for idx, val in zip(ids, evaluate([valid_edges[idx] for idx in ids])):
+            fresh[idx] = val
+            bounds[valid_edges[idx]] = val
+
+    # Edges never evaluated have an infinite upper bound, evaluate them all at once
+    _evaluate_ids([idx for idx, edge in enumerate(valid_edges) if edge not in bounds])
+    heap = [(-bounds[edge], idx) for idx, edge in enumerate(valid_edges)]
+    heapq.heapify(heap)
+    while heap[0][1] not in fresh:
+        _, idx = heapq.heappop(heap)
+        _evaluate_ids([idx])
+        heapq.heappush(heap, (-fresh[idx], idx))
+    best = fresh[heap[0][1]]
+    threshold = best - rtol * abs(best) - atol
+    _evaluate_ids(
+        [idx for bound, idx in heap if idx not in fresh and -bound >= threshold]
+    )
+    log.debug(f"Lazy evaluation of {len(fresh)} out of {len(valid_edges)} edges.")
+    ids = sorted(fresh)
+    return _optimal_edges(
+        [fresh[idx] for idx in ids], [valid_edges[idx] for idx in ids]
+    )
+
+
 def _metric_dictionaries():
     metrics_dict = {}
     metrics_dict["relative_directness"] = {
         "metric_func": metrics.growth_relative_directness,
         "precomp_func": metrics.prefunc_growth_relative_directness,
-        "update_func": None,
+        "update_func": metrics.upfunc_growth_relative_directness,
+        "use_state": True,
+        "submodular": False,
     }
     metrics_dict["directness"] = {
         "metric_func": metrics.growth_directness,
-        "precomp_func": None,
-        "update_func": None,
+        "precomp_func": metrics.prefunc_growth_directness,
+        "update_func": metrics.upfunc_growth_directness,
+        "use_state": True,
+        "submodular": False,
     }
     metrics_dict["coverage"] = {
         "metric_func": metrics.growth_coverage,
         "precomp_func": metrics.prefunc_growth_coverage,
         "update_func": metrics.upfunc_growth_coverage,
+        "use_state": False,
+        "submodular": True,
+        "batch_func": metrics.growth_coverage_batch,
     }
     metrics_dict["adaptive_coverage"] = {
         "metric_func": metrics.growth_coverage,
         "precomp_func": metrics.prefunc_growth_adaptive_coverage,
         "update_func": metrics.upfunc_growth_adaptive_coverage,
+        "use_state": False,
+        "submodular": True,
+        "batch_func": metrics.growth_coverage_batch,
     }
     return metrics_dict
 
 
-def compute_metrics(G, order_growth, built=False, x_meter=True, buff_size=200):
+def compute_metrics(
+    G,
+    order_growth,
+    built=False,
+    x_meter=True,
+    buff_size=200,
+    coverage_backend="shapely",
+    resolution=None,
+    sample_every=None,
+    sample_length=None,
+    n_jobs=1,
+    metrics=None,
+    lazy=False,
+):
     """
     Compute all relevant metrics for the growth of a graph
 
@@ -233,102 +547,359 @@ def compute_metrics(G, order_growth, built=False, x_meter=True, buff_size=200):
         built (bool, optional): If True, the graph will be initialized with all edges having as an attribute "built" = 1. Else it will be initialized with an arbitrary edge of the node with the highest closeness value. Defaults to True.
         x_meter (bool, optional): To add the total length at each step as a metric. Defaults to True.
         buff_size (int, optional): Size of the buffer used to compute the coverage. Defaults to 200.
+        coverage_backend (str, optional): Either shapely to compute the exact area of the union of the buffers, or raster to approximate it on a grid, see raster.RasterCoverage. Defaults to "shapely".
+        resolution (float, optional): Size of the cells of the grid for the raster backend. If None, a tenth of buff_size. Defaults to None.
+        sample_every (int, optional): If not None, compute the coverage, directness and relative directness only every sample_every steps, with NaN values at the other steps, see utils.get_auc. The first and last steps are always computed, and the length, number of components and length of the largest component at every step. Defaults to None.
+        sample_length (float, optional): If not None, compute the coverage, directness and relative directness only at the first step after every sample_length of added length, as for sample_every. Defaults to None.
+        n_jobs (int, optional): Number of processes, -1 to use all CPUs, see parallel.get_n_jobs. The steps are split into consecutive ranges, each process building the graph at the start of its range from the edges of the previous steps, then computing the metrics of its range. Defaults to 1.
+        metrics (list, optional): Names of the metrics to compute, in METRIC_EVALUATORS. Only what they need is computed, for instance no shortest network path length for coverage alone. If None, all of them. Defaults to None.
+        lazy (bool, optional): If True, return a results.LazyMetrics computing the values of each metric on first access instead of a dictionary. Defaults to False.
+
+    Returns:
+        dict: Dictionary with name of the metric as keys and values in order of growth as values, with xx first.
+    """
+    names = _metric_names(metrics)
+    kwargs = {
+        "built": built,
+        "x_meter": x_meter,
+        "sample_every": sample_every,
+        "sample_length": sample_length,
+    }
+
+    def compute(columns):
+        selected = [name for name in columns if name != "xx"]
+        context = _metrics_context(G, buff_size, coverage_backend, resolution, selected)
+        return _split_metrics(G, order_growth, context, selected, kwargs, n_jobs)
+
+    if lazy:
+        return LazyMetrics(["xx"] + names, compute)
+    return compute(names)
+
+
+def _split_metrics(G, order_growth, context, names, kwargs, n_jobs):
+    """Compute the metrics of an order, on ranges of steps in parallel if n_jobs is more than 1, see compute_metrics."""
+    num_values = len(order_growth) + 1
+    n_jobs = min(get_n_jobs(n_jobs), num_values)
+    if n_jobs == 1:
+        return _replay_metrics(G, order_growth, context, names, **kwargs)
+    bounds = np.linspace(0, num_values, n_jobs + 1).astype(int)
+    log.info(f"Computing the metrics of {num_values} steps on {n_jobs} processes.")
+    with multiprocessing.Pool(
+        n_jobs, initializer=_init_metrics_worker, initargs=(G, context, names, kwargs)
+    ) as pool:
+        chunks = pool.map(
+            _replay_worker_metrics,
+            [(order_growth, start, stop) for start, stop in zip(bounds, bounds[1:])],
+        )
+    return {key: [val for chunk in chunks for val in chunk[key]] for key in chunks[0]}
+
+
+def compute_metrics_batch(
+    G,
+    orders,
+    built=False,
+    x_meter=True,
+    buff_size=200,
+    coverage_backend="shapely",
+    resolution=None,
+    sample_every=None,
+    sample_length=None,
+    n_jobs=1,
+    metrics=None,
+):
+    """
+    Compute all relevant metrics for multiple growths of the same graph, such as the trials of a random growth. Everything depending only on the graph, namely the buffers of the edges and the shortest network path length and euclidean distance matrices of the final graph, is computed once and shared by all orders.
+
+    Args:
+        G (networkx.Graph): Final graph. The initial graph from where we grow is based on the built attribute.
+        orders (list): List of orders of growth, each one being a list of ordered edges as in compute_metrics, all with the same number of steps.
+        built (bool, optional): If True, the graph will be initialized with all edges having as an attribute "built" = 1. Else it will be initialized with the first edge of G not in the order. Defaults to False.
+        x_meter (bool, optional): To add the total length at each step as a metric. Defaults to True.
+        buff_size (int, optional): Size of the buffer used to compute the coverage. Defaults to 200.
+        coverage_backend (str, optional): Either shapely or raster, see compute_metrics. Defaults to "shapely".
+        resolution (float, optional): Size of the cells of the grid for the raster backend. If None, a tenth of buff_size. Defaults to None.
+        sample_every (int, optional): Number of steps between the computations of the expensive metrics, see compute_metrics. Defaults to None.
+        sample_length (float, optional): Added length between the computations of the expensive metrics, see compute_metrics. Defaults to None.
+        n_jobs (int, optional): Number of processes, -1 to use all CPUs, see parallel.get_n_jobs. Defaults to 1.
+        metrics (list, optional): Names of the metrics to compute, see compute_metrics. If None, all of them. Defaults to None.
 
     Returns:
-        dict: Dictionary with name of the metric as keys and values in order of growth as values.
+        dict: Dictionary with name of the metric as keys and arrays of shape (number of orders, number of steps) as values, each row being the values of an order.
     """
+    if len({len(order_growth) for order_growth in orders}) > 1:
+        raise ValueError("All orders need to have the same number of steps.")
+    names = _metric_names(metrics)
+    context = _metrics_context(G, buff_size, coverage_backend, resolution, names)
+    kwargs = {
+        "built": built,
+        "x_meter": x_meter,
+        "sample_every": sample_every,
+        "sample_length": sample_length,
+    }
+    n_jobs = min(get_n_jobs(n_jobs), max(len(orders), 1))
+    log.info(f"Computing the metrics of {len(orders)} orders on {n_jobs} processes.")
+    if n_jobs == 1:
+        results = [
+            _replay_metrics(G, order_growth, context, names, **kwargs)
+            for order_growth in orders
+        ]
+    else:
+        with multiprocessing.Pool(
+            n_jobs,
+            initializer=_init_metrics_worker,
+            initargs=(G, context, names, kwargs),
+        ) as pool:
+            results = pool.map(
+                _replay_worker_metrics,
+                [(order_growth, 0, None) for order_growth in orders],
+                chunksize=-(-len(orders) // n_jobs),
+            )
+    if not results:
+        return {}
+    return {key: np.array([result[key] for result in results]) for key in results[0]}
+
+
+# Graph and shared values of a worker process, set once by _init_metrics_worker
+_METRICS_CONTEXT = {}
+
+
+def _init_metrics_worker(G, context, names, kwargs):
+    """Set the graph, the values shared by all orders, the names of the metrics and the arguments of _replay_metrics of a worker process once."""
+    _METRICS_CONTEXT.update(G=G, context=context, names=names, kwargs=kwargs)
+
+
+def _replay_worker_metrics(task):
+    """Compute the metrics of the range of steps from start to stop of an order in a worker process."""
+    order_growth, start, stop = task
+    return _replay_metrics(
+        _METRICS_CONTEXT["G"],
+        order_growth,
+        _METRICS_CONTEXT["context"],
+        _METRICS_CONTEXT["names"],
+        start=start,
+        stop=stop,
+        **_METRICS_CONTEXT["kwargs"],
+    )
+
+
+def _metric_names(names=None):
+    """Return the list of names of the metrics to compute, all the ones of METRIC_EVALUATORS if names is None."""
+    if names is None:
+        return list(METRIC_EVALUATORS)
+    for name in names:
+        if name not in METRIC_EVALUATORS:
+            raise ValueError(
+                f"Unknown metric {name}, use one of {list(METRIC_EVALUATORS)}."
+            )
+    return list(names)
+
+
+def _requirements(names):
+    """Return the set of values needed by the evaluators of the metrics."""
+    return {req for name in names for req in METRIC_EVALUATORS[name]["requires"]}
+
+
+def _metrics_context(G, buff_size, coverage_backend, resolution, names=None):
+    """Return the values used by compute_metrics depending only on the final graph, to share them between orders, only the ones needed by the metrics."""
+    if coverage_backend not in ["shapely", "raster"]:
+        raise ValueError(
+            f"Unknown coverage backend {coverage_backend}, use either shapely or raster."
+        )
+    requires = _requirements(_metric_names(names))
+    context = {}
+    if "coverage" in requires:
+        if coverage_backend == "raster":
+            context["coverage"] = RasterCoverage(EdgeBuffers(G, buff_size), resolution)
+        else:
+            context["coverage"] = BufferUnion(EdgeBuffers(G, buff_size))
+    if "fsm" in requires:
+        context["fsm"] = metrics.get_shortest_network_path_length_matrix(G)
+    if "fem" in requires:
+        # Node positions don't change, so the euclidean distances are indexed by the nodes of each step
+        context["fem"] = metrics.get_euclidean_distance_matrix(G)
+    return context
+
+
+def _replay_metrics(
+    G,
+    order_growth,
+    context,
+    names,
+    built=False,
+    x_meter=True,
+    sample_every=None,
+    sample_length=None,
+    start=0,
+    stop=None,
+):
+    """Compute the metrics of compute_metrics for an order with the values of _metrics_context, updating them at each step, or only at the sampled steps for the expensive ones. Only the values of the steps from start to stop are computed, the graph at start being built from the edges of the previous steps, so that ranges of steps can be computed independently."""
     if built:
         G_actual = G.edge_subgraph(
             [edge for edge in G.edges if G.edges[edge]["built"] == 1]
         )
     else:
-        # Edges need to be tuple in order growth in order to work !!!
+        # Edges can be lists in orders loaded from JSON files
+        steps = {tuple(step) for step in order_growth}
         for edge in G.edges:
-            if edge not in order_growth:
-                if len(edge) == 3:
-                    reverse = [edge[1], edge[0], edge[2]]
-                else:
-                    reverse = tuple(reversed(edge))
-                if reverse not in order_growth:
-                    G_actual = G.edge_subgraph([edge])
-                    break
-    actual_edges = [edge for edge in G_actual.edges]
-    xx = []
+            if edge not in steps and (edge[1], edge[0], *edge[2:]) not in steps:
+                G_actual = G.edge_subgraph([edge])
+                break
+    if stop is None:
+        stop = len(order_growth) + 1
+    actual_edges = [edge for edge in G_actual.edges] + list(order_growth[:start])
+    lengths = [sum([G_actual.edges[edge]["length"] for edge in G_actual.edges])]
+    for step in order_growth:
+        lengths.append(lengths[-1] + G.edges[step]["length"])
     if x_meter:
-        total_length = sum([G_actual.edges[edge]["length"] for edge in G_actual.edges])
-        xx.append(total_length)
-        for step in order_growth:
-            total_length += G.edges[step]["length"]
-            xx.append(total_length)
+        xx = lengths[start:stop]
     else:
-        xx = range(len(order_growth))
-    geom = [G.edges[edge]["geometry"].buffer(buff_size) for edge in G_actual.edges]
-    coverage = []
-    directness = []
-    relative_directness = []
-    # Should add computation of global and local efficiency to compare with GrowBike
-    num_cc = []
-    length_lcc = []
-    fsm = metrics.get_shortest_network_path_length_matrix(G)
-    coverage.append(shapely.ops.unary_union(geom).area)
-    directness.append(metrics.directness(G_actual))
-    ids_to_delete = [ids for ids, node in enumerate(G.nodes) if node not in G_actual]
-    fsmt = np.delete(np.delete(fsm, ids_to_delete, 0), ids_to_delete, 1)
-    mat = metrics._avoid_zerodiv_matrix(
-        fsmt, metrics.get_shortest_network_path_length_matrix(G_actual)
-    )
-    relative_directness.append(np.sum(mat) / np.count_nonzero(mat))
-    cc = list(nx.connected_components(G_actual))
-    num_cc.append(len(cc))
-    length_lcc.append(
-        max(
-            [
-                sum(
-                    [G_actual.edges[e]["length"] for e in G_actual.subgraph(comp).edges]
-                )
-                for comp in cc
-            ]
+        xx = range(len(order_growth))[start:stop]
+    sampled = _sampled_steps(lengths, sample_every, sample_length)
+    # The coverage, the shortest network path lengths and the components are updated with each step, only if a metric needs them
+    requires = _requirements(names)
+    values = {key: context[key] for key in ["fem", "fsm"] if key in context}
+    coverage_area = context.get("coverage")
+    if coverage_area is not None:
+        coverage_area.reset(actual_edges)
+    state = GrowthState(G, "additive", actual_edges)
+    # Between distant samples, computing the distances again is cheaper than updating them at each step
+    distances = None
+    if "distances" in requires and (
+        sampled.all()
+        or any(
+            not METRIC_EVALUATORS[name]["sampled"]
+            and "distances" in METRIC_EVALUATORS[name]["requires"]
+            for name in names
         )
-    )
-    for edge in order_growth:
-        actual_edges.append(edge)
-        G_actual = G.edge_subgraph(actual_edges)
-        geom.append(G.edges[edge]["geometry"].buffer(buff_size))
-        coverage.append(shapely.ops.unary_union(geom).area)
-        directness.append(metrics.directness(G_actual))
-        ids_to_delete = [
-            ids for ids, node in enumerate(G.nodes) if node not in G_actual
+    ):
+        distances = IncrementalDistances(state)
+    if "components" in requires:
+        values["components"] = ComponentLengths(G, actual_edges)
+    pending = []
+    metrics_dict = {"xx": xx}
+    for name in names:
+        metrics_dict[name] = []
+
+    def append_metrics(idx):
+        evaluated = [
+            name
+            for name in names
+            if sampled[idx] or not METRIC_EVALUATORS[name]["sampled"]
         ]
-        fsmt = np.delete(np.delete(fsm, ids_to_delete, 0), ids_to_delete, 1)
-        mat = metrics._avoid_zerodiv_matrix(
-            fsmt, metrics.get_shortest_network_path_length_matrix(G_actual)
-        )
-        relative_directness.append(np.sum(mat) / np.count_nonzero(mat))
-        cc = list(nx.connected_components(G_actual))
-        num_cc.append(len(cc))
-        length_lcc.append(
-            max(
-                [
-                    sum(
-                        [
-                            G_actual.edges[e]["length"]
-                            for e in G_actual.subgraph(comp).edges
-                        ]
-                    )
-                    for comp in cc
-                ]
-            )
-        )
-    metrics_dict = {}
-    metrics_dict["xx"] = xx
-    metrics_dict["coverage"] = coverage
-    metrics_dict["directness"] = directness
-    metrics_dict["relative_directness"] = relative_directness
-    metrics_dict["num_cc"] = num_cc
-    metrics_dict["length_lcc"] = length_lcc
+        requires = _requirements(evaluated)
+        if "coverage" in requires:
+            coverage_area.extend(pending)
+            pending.clear()
+            values["coverage"] = coverage_area
+        if "distances" in requires:
+            if distances is not None:
+                values["sm"] = metrics.submatrix(distances.matrix, state.node_ids())
+            else:
+                values["sm"] = state.shortest_path_length_matrix()
+        for name in names:
+            if name in evaluated:
+                metrics_dict[name].append(
+                    METRIC_EVALUATORS[name]["func"](G, state, **values)
+                )
+            else:
+                metrics_dict[name].append(np.nan)
+
+    append_metrics(start)
+    for idx in range(start + 1, stop):
+        edge = order_growth[idx - 1]
+        if coverage_area is not None:
+            pending.append(edge)
+        state.apply(edge)
+        if distances is not None:
+            distances.apply(state, edge)
+        if "components" in values:
+            values["components"].add(edge)
+        append_metrics(idx)
     return metrics_dict
 
 
+def _sampled_steps(lengths, sample_every=None, sample_length=None):
+    """Return the boolean array of the steps where the expensive metrics are computed, from the total length at each step, with either a number of steps or a length between samples, always including the first and last steps."""
+    if sample_every is not None and sample_length is not None:
+        raise ValueError("Give either sample_every or sample_length, not both.")
+    if sample_every is not None and sample_every < 1:
+        raise ValueError(f"sample_every needs to be at least 1, not {sample_every}.")
+    if sample_length is not None and sample_length <= 0:
+        raise ValueError(f"sample_length needs to be positive, not {sample_length}.")
+    lengths = np.asarray(lengths, dtype=float)
+    if sample_every is not None:
+        sampled = np.arange(len(lengths)) % sample_every == 0
+    elif sample_length is not None:
+        # First step reaching each multiple of sample_length of added length
+        bins = np.floor((lengths - lengths[0]) / sample_length)
+        sampled = np.concatenate([[True], bins[1:] > bins[:-1]])
+    else:
+        sampled = np.ones(len(lengths), dtype=bool)
+    sampled[-1] = True
+    return sampled
+
+
+def _mean_ratio(state, ref, sm):
+    """Return the mean ratio between the matrix ref of the final graph and the matrix of shortest network path lengths sm of the actual graph of the state, on the pairs of connected nodes."""
+    mat = metrics._avoid_zerodiv_matrix(metrics.submatrix(ref, state.node_ids()), sm)
+    return np.sum(mat) / np.count_nonzero(mat)
+
+
+def _evaluate_coverage(G, state, coverage=None, **kwargs):
+    """Return the area covered by the buffers of the edges of the actual graph."""
+    return coverage.area
+
+
+def _evaluate_directness(G, state, sm=None, fem=None, **kwargs):
+    """Return the directness of the actual graph, the mean ratio between euclidean distances and shortest network path lengths."""
+    return _mean_ratio(state, fem, sm)
+
+
+def _evaluate_relative_directness(G, state, sm=None, fsm=None, **kwargs):
+    """Return the relative directness of the actual graph, the mean ratio between shortest network path lengths in the final graph and in the actual graph."""
+    return _mean_ratio(state, fsm, sm)
+
+
+def _evaluate_num_cc(G, state, components=None, **kwargs):
+    """Return the number of connected components of the actual graph."""
+    return components.num_components
+
+
+def _evaluate_length_lcc(G, state, components=None, **kwargs):
+    """Return the length of the largest connected component of the actual graph."""
+    return components.max_length
+
+
+# Evaluators of the metrics of compute_metrics, called at each step as func(G, state, **values) with state the GrowthState of the actual graph. The values are the ones in requires: coverage for a raster.RasterCoverage or unions.BufferUnion, components for a components.ComponentLengths, distances for sm the shortest network path lengths of the actual graph, fem and fsm for the euclidean distance and shortest network path length matrices of the final graph. If sampled is True, the metric is only computed at the steps sampled with sample_every or sample_length. New metrics can be added to this dictionary.
+METRIC_EVALUATORS = {
+    "coverage": {
+        "func": _evaluate_coverage,
+        "requires": ["coverage"],
+        "sampled": True,
+    },
+    "directness": {
+        "func": _evaluate_directness,
+        "requires": ["distances", "fem"],
+        "sampled": True,
+    },
+    "relative_directness": {
+        "func": _evaluate_relative_directness,
+        "requires": ["distances", "fsm"],
+        "sampled": True,
+    },
+    "num_cc": {
+        "func": _evaluate_num_cc,
+        "requires": ["components"],
+        "sampled": False,
+    },
+    "length_lcc": {
+        "func": _evaluate_length_lcc,
+        "requires": ["components"],
+        "sampled": False,
+    },
+}
+
+
 def _init_edges(G, built, order):
     """Return the initial edges for the first step of the growth of G."""
     if built:
@@ -348,16 +919,22 @@ def _init_edges(G, built, order):
             return [tuple(max(edge_closeness, key=edge_closeness.get))]
 
 
-def _init_graph(G, order, init_edges):
-    """Return the initial graph for the growth depending on the order."""
-    if order == "subtractive":
-        return G.copy()
-    elif order == "additive":
-        return G.edge_subgraph(init_edges)
+def _init_connectivity(G, G_actual, built, keep_connected, order):
+    """Return the structure keeping track of the valid edges during the growth if there is one for this order, else None."""
+    if keep_connected:
+        if order == "subtractive":
+            return SubtractiveConnectivity(G_actual, built=built)
+        elif order == "additive":
+            return AdditiveFrontier(G, G_actual)
+    return None
 
 
-def _valid_edges(G, G_actual, init_edges, built, keep_connected, order):
+def _valid_edges(
+    G, G_actual, init_edges, built, keep_connected, order, connectivity=None
+):
     """Return the valid edges to add or remove for the next step of the growth of G from G_actual."""
+    if connectivity is not None:
+        return connectivity.valid_edges()
     # If connectedness constraint remove invalid edges that would add unacceptable new component
     if keep_connected:
         if order == "subtractive":
@@ -373,36 +950,9 @@ def _valid_edges(G, G_actual, init_edges, built, keep_connected, order):
             return [edge for edge in G.edges if edge not in G_actual.edges]
 
 
-def _update_tested_graph(G_actual, G, edge, order):
-    """Update the tested graph by removing/adding the tested edge to the actual graph."""
-    if order == "subtractive":
-        H = G_actual.copy()
-        H.remove_edge(*edge)
-    elif order == "additive":
-        temp_edges = list(G_actual.edges)
-        temp_edges.append(edge)
-        H = G.edge_subgraph(temp_edges)
-    return H
-
-
-def _update_actual_graph(G, G_actual, step, order):
-    """Remove or add the chosen step to the actual graph."""
-    if order == "subtractive":
-        G_actual.remove_edge(*step)
-        # Remove isolated node from the graph
-        for n in step[:2]:
-            if nx.degree(G_actual, n) == 0:
-                G_actual.remove_node(n)
-    elif order == "additive":
-        actual_edges = list(G_actual.edges)
-        actual_edges.append(step)
-        G_actual = G.edge_subgraph(actual_edges)
-    return G_actual
-
-
 def get_subtractive_invalid_edges(G, built=True):
     """
-     Find all invalid edges that if removed would create a new, unacceptable component to the graph. A new component is unacceptable if it's not a subgraph of a component that is part of the built graph but not of the actual graph.
+     Find all invalid edges that if removed would create a new, unacceptable component to the graph. A new component is unacceptable if it's not a subgraph of a component that is part of the built graph but not of the actual graph. Only bridges can create a new component, so all invalid edges are found in a single pass, see connectivity.SubtractiveConnectivity.
 
     Args:
         G (networkx.Graph): Graph on which we want to remove edges.
@@ -411,42 +961,7 @@ def get_subtractive_invalid_edges(G, built=True):
     Returns:
         list: List of tuple, each tuple being an invalid edge to remove from G.
     """
-    invalid_edges = []
-    # Put built edges in invalid edges to remove
-    if built:
-        built_edges = [edge for edge in G.edges if G.edges[edge]["built"] == 1]
-        invalid_edges += built_edges
-        elected_nodes = elect_nodes(G.edge_subgraph(built_edges))
-    init_num_cc = nx.number_connected_components(G)
-    for edge in G.edges:
-        H = G.copy()
-        H.remove_edge(*edge)
-        # Remove isolated nodes
-        for node in edge[:2]:
-            if H.degree(node) == 0:
-                H.remove_node(node)
-        # If new component is created by removing an edge
-        if nx.number_connected_components(H) > init_num_cc:
-            if built:
-                # If edge is built already, already in the invalid edges so pass
-                if G.edges[edge]["built"] == 1:
-                    pass
-                # If edge is not built, need to check if there is any component without a built part
-                # TODO simplify in a double any list comprehension ?
-                else:
-                    for cc in list(nx.connected_components(H)):
-                        test = []
-                        for node in elected_nodes:
-                            if node in cc:
-                                test.append(True)
-                            else:
-                                test.append(False)
-                        if not any(test):
-                            invalid_edges.append(edge)
-                            break
-            else:
-                invalid_edges.append(edge)
-    return invalid_edges
+    return SubtractiveConnectivity(G, built=built).invalid_edges()
 
 
 ## Was not working for real network
@@ -494,7 +1009,7 @@ def get_subtractive_invalid_edges(G, built=True):
 
 def get_additive_invalid_edges(G_actual, G_final):
     """
-    Find all invalid edges that if added would create a new, unacceptable component to the graph. A new component is unacceptable if it's not a subgraph of a component that is part of the final graph but not of the actual graph.
+    Find all invalid edges that if added would create a new, unacceptable component to the graph. A new component is unacceptable if it's not a subgraph of a component that is part of the final graph but not of the actual graph. See connectivity.AdditiveFrontier to keep track of them during the growth.
 
     Args:
         G_actual (networkx.Graph): Graph on which we want to add edges.
@@ -503,31 +1018,7 @@ def get_additive_invalid_edges(G_actual, G_final):
     Returns:
         list: List of tuple, each tuple being an invalid edge to add to G_actual from G_final.
     """
-    invalid_edges = [
-        edge
-        for edge in G_final.edges
-        if (not any(node in G_actual for node in edge[:2])) or edge in G_actual.edges
-    ]
-    # If already the final number of cc or will connect in the future give list of adjacent edge only
-    if nx.number_connected_components(G_actual) >= nx.number_connected_components(
-        G_final
-    ):
-        return invalid_edges
-    # Else a new component can be created, but need to be within a final component not already on the graph
-    else:
-        updated_invalid_edges = invalid_edges.copy()
-        for edge in invalid_edges:
-            new_edges = list(G_actual.edges)
-            # Graph.edge_subgraph can only use list of tuple, not list of list
-            new_edges.append(tuple(edge))
-            H = G_final.edge_subgraph(new_edges)
-            # Accept edges (remove from invalid edges) that if added to the graph create a new component that is a subgraph of a component of the final graph
-            if not any(
-                not any(node in cc for node in elect_nodes(H))
-                for cc in list(nx.connected_components(G_final))
-            ):
-                updated_invalid_edges.remove(edge)
-        return updated_invalid_edges
+    return AdditiveFrontier(G_final, G_actual).invalid_edges()
 
 
 def elect_nodes(G):
@@ -13,6 +13,11 @@ import scipy
 from haversine import haversine
 import osmnx as ox
 
+from .distances import DecrementalDistances, IncrementalDistances
+from .buffers import EdgeBuffers, buffer_geometries
+from .cache import SpatialCache
+from .raster import RasterCoverage
+from .unions import UnionTree
 from .utils import get_node_positions, dist_vector, log, get_node_dict
 
 __all__ = [
@@ -23,11 +28,13 @@ __all__ = [
 ]
 
 
-def growth_random(G):
-    """Return a list of all edges of G in a random order."""
+def growth_random(G, rng=None):
+    """Return a list of all edges of G in a random order. If rng, a numpy random Generator, is given use it for a reproducible order, else use the random module."""
     edgelist = list(G.edges)
-    random.shuffle(edgelist)
-    return edgelist
+    if rng is None:
+        random.shuffle(edgelist)
+        return edgelist
+    return [edgelist[idx] for idx in rng.permutation(len(edgelist))]
 
 
 def growth_betweenness(G, weight="length"):
@@ -69,8 +76,27 @@ def growth_coverage(
     threshold_max_change=0.9,
     keep_searching=True,
     max_area=0,
+    covered=None,
+    union_tree=None,
+    raster=None,
+    resolution=None,
+    area_cache=None,
 ):
-    """Get coverage of the graph G. Works with growth.dynamic_growth function. Use prefunc_growth_coverage and upfunc_growth_coverage for classic coverage, use prefunc_growth_adaptive_coverage and upfunc_growth_adaptive_coverage for adaptive coverage."""
+    """Get coverage of the graph G. Works with growth.dynamic_growth function. Use prefunc_growth_coverage and upfunc_growth_coverage for classic coverage, use prefunc_growth_adaptive_coverage and upfunc_growth_adaptive_coverage for adaptive coverage. In additive order, if the covered area of the actual graph is given, only the part of the buffer of the edge outside of it is computed, see get_coverage_gains. In subtractive order, if the union tree of the buffers is given, the area without the edge is read from it, see unions.UnionTree. If the raster coverage is given, the areas are approximated on its grid, see raster.RasterCoverage."""
+    if raster is not None or covered is not None or union_tree is not None:
+        graph = pregraph if order == "subtractive" else G
+        return _coverage_values(
+            graph,
+            [edge],
+            order,
+            actual_area,
+            buff_size,
+            keep_searching,
+            covered,
+            union_tree,
+            raster,
+            area_cache,
+        )[0]
     geom_new = geom.copy()
     # If subtractive, since new_area - actual_area <= 0 the max is one changing less the area
     if order == "subtractive":
@@ -87,23 +113,165 @@ def growth_coverage(
             return 0
 
 
-def prefunc_growth_coverage(G_actual, G_final, order, buff_size=200):
-    """Pre-compute the dictionary of buffered geometries of the edges and the actual area for the coverage growth optimization."""
+def growth_coverage_batch(
+    G,
+    edges,
+    order,
+    actual_area=0,
+    buff_size=200,
+    keep_searching=True,
+    covered=None,
+    union_tree=None,
+    raster=None,
+    area_cache=None,
+    **kwargs,
+):
+    """Get the values of growth_coverage for all edges at once. With the covered area, the union tree or the raster coverage, the values of all edges are computed together, else growth_coverage is used on each edge."""
+    if raster is not None or covered is not None or union_tree is not None:
+        return _coverage_values(
+            G,
+            edges,
+            order,
+            actual_area,
+            buff_size,
+            keep_searching,
+            covered,
+            union_tree,
+            raster,
+            area_cache,
+        ).tolist()
+    return [
+        growth_coverage(
+            G,
+            edge,
+            order,
+            actual_area=actual_area,
+            buff_size=buff_size,
+            keep_searching=keep_searching,
+            **kwargs,
+        )
+        for edge in edges
+    ]
+
+
+def _coverage_values(
+    G,
+    edges,
+    order,
+    actual_area,
+    buff_size,
+    keep_searching,
+    covered,
+    union_tree,
+    raster,
+    area_cache,
+):
+    """Return the values of growth_coverage for the edges of G from the area gained (resp. lost) by adding (resp. removing) each edge, kept in the spatial cache if given since it only changes when a step is chosen close to the edge."""
+    if order == "additive" and not keep_searching:
+        return np.zeros(len(edges))
+
+    def areas_func(missing):
+        if raster is not None:
+            if order == "subtractive":
+                return raster.lost_areas(missing)
+            return raster.gained_areas(missing)
+        if order == "subtractive":
+            return [union_tree.exclusive_area(edge) for edge in missing]
+        buffers = area_cache.buffers if area_cache is not None else None
+        return get_coverage_gains(G, missing, buff_size, covered, buffers=buffers)
+
+    if area_cache is not None:
+        areas = area_cache.get(edges, areas_func)
+    else:
+        areas = np.asarray(areas_func(edges), dtype=float)
+    lengths = np.array([G.edges[edge]["length"] for edge in edges], dtype=float)
+    # If subtractive, the value is the area without the edge minus the actual area
+    if order == "subtractive":
+        total_area = raster.area if raster is not None else union_tree.area
+        return (total_area - areas - actual_area) / lengths
+    return areas / lengths
+
+
+def get_coverage_gains(G, edges, buff_size, covered, buffers=None):
+    """
+    Get the area added to the covered area by the buffer of each edge, as area(buffer) - area(buffer ∩ covered). All buffers are computed with vectorized shapely operations, and only the ones intersecting the covered area without being inside it need an intersection.
+
+    Args:
+        G (networkx.Graph): Graph with the edges.
+        edges (list): List of edges.
+        buff_size (float): Size of the buffer around the edges.
+        covered (shapely.Geometry): Union of the buffers of the edges of the actual graph.
+        buffers (buffers.EdgeBuffers, optional): Buffers of the edges of size buff_size computed once. If None, the buffers of the edges are computed. Defaults to None.
+
+    Returns:
+        numpy.array: Added area of each edge.
+    """
+    if buffers is not None:
+        buffers = buffers.get(edges)
+    else:
+        buffers = buffer_geometries(
+            [G.edges[edge]["geometry"] for edge in edges], buff_size
+        )
+    gains = shapely.area(buffers)
+    shapely.prepare(covered)
+    inside = shapely.contains(covered, buffers)
+    partial = shapely.intersects(covered, buffers) & ~inside
+    gains[inside] = 0.0
+    gains[partial] -= shapely.area(shapely.intersection(buffers[partial], covered))
+    return gains
+
+
+def prefunc_growth_coverage(
+    G_actual, G_final, order, buff_size=200, coverage_backend="shapely", resolution=None
+):
+    """Pre-compute the dictionary of buffered geometries of the edges and the actual area for the coverage growth optimization. If coverage_backend is raster, the coverage is approximated on a grid with cells of size resolution instead, see raster.RasterCoverage."""
+    buffers = EdgeBuffers(G_final, buff_size)
+    raster = _init_raster(buffers, G_actual, coverage_backend, resolution)
+    if raster is not None:
+        return {
+            "pregraph": G_actual,
+            "order": order,
+            "geom": None,
+            "actual_area": raster.area,
+            "max_area": raster.area,
+            "buff_size": buff_size,
+            "keep_searching": True,
+            "covered": None,
+            "union_tree": None,
+            "raster": raster,
+            "area_cache": SpatialCache(buffers),
+        }
     gdf = ox.graph_to_gdfs(G_actual, nodes=False, edges=True)
     geom = gdf.geometry.buffer(buff_size)
     gdf = ox.graph_to_gdfs(G_actual, nodes=False, edges=True)
     max_area = gdf.geometry.buffer(buff_size).union_all().area
+    covered = geom.union_all()
     return {
         "pregraph": G_actual,
         "order": order,
         "geom": geom.to_dict(),
-        "actual_area": geom.union_all().area,
+        "actual_area": covered.area,
         "max_area": max_area,
         "buff_size": buff_size,
         "keep_searching": True,
+        "covered": covered if order == "additive" else None,
+        "union_tree": UnionTree(geom.to_dict()) if order == "subtractive" else None,
+        "raster": None,
+        "area_cache": SpatialCache(buffers),
     }
 
 
+def _init_raster(buffers, G_actual, coverage_backend, resolution):
+    """Return the raster coverage of the buffers of the final graph with the edges of the actual graph added if coverage_backend is raster, None if it is shapely."""
+    if coverage_backend == "raster":
+        return RasterCoverage(buffers, resolution, edges=G_actual.edges)
+    if coverage_backend != "shapely":
+        raise ValueError(
+            f"Unknown coverage backend {coverage_backend}, use either shapely or raster."
+        )
+    return None
+
+
 def upfunc_growth_coverage(
     G,
     G_actual,
@@ -115,12 +283,28 @@ def upfunc_growth_coverage(
     pregraph=None,
     keep_searching=True,
     max_area=0,
+    covered=None,
+    union_tree=None,
+    raster=None,
+    area_cache=None,
 ):
+    """Update the area of the actual graph with the chosen step, and remove from the spatial cache the values of the edges close to it."""
+    if area_cache is not None:
+        area_cache.invalidate(step)
     if order == "subtractive":
-        geom.pop(step)
+        if raster is not None:
+            raster.remove(step)
+        else:
+            geom.pop(step)
+            union_tree.remove(step)
     elif order == "additive":
-        geom[step] = G.edges[step]["geometry"].buffer(buff_size)
-        actual_area = shapely.ops.unary_union(list(geom.values())).area
+        if raster is not None:
+            raster.add(step)
+            actual_area = raster.area
+        else:
+            geom[step] = G.edges[step]["geometry"].buffer(buff_size)
+            covered = shapely.ops.unary_union(list(geom.values()))
+            actual_area = covered.area
         if actual_area == max_area:
             keep_searching = False
         else:
@@ -133,6 +317,10 @@ def upfunc_growth_coverage(
         "buff_size": buff_size,
         "keep_searching": keep_searching,
         "max_area": max_area,
+        "covered": covered,
+        "union_tree": union_tree,
+        "raster": raster,
+        "area_cache": area_cache,
     }
 
 
@@ -144,25 +332,52 @@ def prefunc_growth_adaptive_coverage(
     max_buff=400,
     threshold_min_change=0.1,
     threshold_max_change=0.9,
+    coverage_backend="shapely",
+    resolution=None,
 ):
-    """Pre-compute the dictionary of buffered geometries of the edges and the actual area for the coverage growth optimization."""
+    """Pre-compute the dictionary of buffered geometries of the edges and the actual area for the coverage growth optimization. If coverage_backend is raster, the coverage is approximated on a grid with cells of size resolution instead, see raster.RasterCoverage."""
     if order == "additive":
         buff_size = max_buff
     elif order == "subtractive":
         buff_size = min_buff
     log.info(f"Starting buffer size for {order} adapative coverage is {buff_size}.")
+    buffers = EdgeBuffers(G_final, buff_size)
+    raster = _init_raster(buffers, G_actual, coverage_backend, resolution)
+    if raster is not None:
+        return {
+            "pregraph": G_actual,
+            "order": order,
+            "geom": None,
+            "actual_area": raster.area,
+            "buff_size": buff_size,
+            "min_buff": min_buff,
+            "max_buff": max_buff,
+            "threshold_min_change": threshold_min_change,
+            "threshold_max_change": threshold_max_change,
+            "covered": None,
+            "union_tree": None,
+            "raster": raster,
+            "resolution": resolution,
+            "area_cache": SpatialCache(buffers),
+        }
     gdf = ox.graph_to_gdfs(G_actual, nodes=False, edges=True)
     geom = gdf.geometry.buffer(buff_size)
+    covered = geom.union_all()
     return {
         "pregraph": G_actual,
         "order": order,
         "geom": geom.to_dict(),
-        "actual_area": geom.union_all().area,
+        "actual_area": covered.area,
         "buff_size": buff_size,
         "min_buff": min_buff,
         "max_buff": max_buff,
         "threshold_min_change": threshold_min_change,
         "threshold_max_change": threshold_max_change,
+        "covered": covered if order == "additive" else None,
+        "union_tree": UnionTree(geom.to_dict()) if order == "subtractive" else None,
+        "raster": None,
+        "resolution": resolution,
+        "area_cache": SpatialCache(buffers),
     }
 
 
@@ -179,14 +394,30 @@ def upfunc_growth_adaptive_coverage(
     geom=None,
     actual_area=0,
     pregraph=None,
+    covered=None,
+    union_tree=None,
+    raster=None,
+    resolution=None,
+    area_cache=None,
 ):
     """Pre-compute the dictionary of buffered geometries of the edges and the actual area for the coverage growth optimization, and in additive (resp. subtractive) order reduce (resp. increase) the buffer size if too big (resp. small)."""
+    if area_cache is not None:
+        area_cache.invalidate(step)
     step_geom = G.edges[step]["geometry"].buffer(buff_size)
-    if order == "subtractive":
+    if raster is not None:
+        if order == "subtractive":
+            raster.remove(step)
+        elif order == "additive":
+            raster.add(step)
+        new_area = raster.area
+    elif order == "subtractive":
         geom.pop(step)
+        union_tree.remove(step)
+        new_area = union_tree.area
     elif order == "additive":
         geom[step] = step_geom
-    new_area = shapely.ops.unary_union(list(geom.values())).area
+        covered = shapely.ops.unary_union(list(geom.values()))
+        new_area = covered.area
     if order == "subtractive":
         if buff_size < max_buff:
             change = (actual_area - new_area) / (step_geom.area - np.pi * buff_size**2)
@@ -198,11 +429,18 @@ def upfunc_growth_adaptive_coverage(
                 if buff_size >= max_buff:
                     buff_size = max_buff
                 log.debug(f"New buffer size is {buff_size}.")
-                geom = {
-                    edge: G_actual.edges[edge]["geometry"].buffer(buff_size)
-                    for edge in G_actual.edges
-                }
-                new_area = shapely.ops.unary_union(list(geom.values())).area
+                buffers = EdgeBuffers(G, buff_size)
+                area_cache = SpatialCache(buffers)
+                if raster is not None:
+                    raster = RasterCoverage(buffers, resolution, G_actual.edges)
+                    new_area = raster.area
+                else:
+                    geom = {
+                        edge: G_actual.edges[edge]["geometry"].buffer(buff_size)
+                        for edge in G_actual.edges
+                    }
+                    union_tree = UnionTree(geom)
+                    new_area = union_tree.area
     elif order == "additive":
         if buff_size > min_buff:
             change = (new_area - actual_area) / (step_geom.area - np.pi * buff_size**2)
@@ -214,11 +452,18 @@ def upfunc_growth_adaptive_coverage(
                 if buff_size <= min_buff:
                     buff_size = min_buff
                 log.debug(f"New buffer size is {buff_size}.")
-                geom = {
-                    edge: G_actual.edges[edge]["geometry"].buffer(buff_size)
-                    for edge in G_actual.edges
-                }
-                new_area = shapely.ops.unary_union(list(geom.values())).area
+                buffers = EdgeBuffers(G, buff_size)
+                area_cache = SpatialCache(buffers)
+                if raster is not None:
+                    raster = RasterCoverage(buffers, resolution, G_actual.edges)
+                    new_area = raster.area
+                else:
+                    geom = {
+                        edge: G_actual.edges[edge]["geometry"].buffer(buff_size)
+                        for edge in G_actual.edges
+                    }
+                    covered = shapely.ops.unary_union(list(geom.values()))
+                    new_area = covered.area
     return {
         "pregraph": G,
         "order": order,
@@ -229,25 +474,91 @@ def upfunc_growth_adaptive_coverage(
         "min_buff": min_buff,
         "threshold_min_change": threshold_min_change,
         "threshold_max_change": threshold_max_change,
+        "covered": covered if order == "additive" else None,
+        "union_tree": union_tree,
+        "raster": raster,
+        "resolution": resolution,
+        "area_cache": area_cache,
     }
 
 
-def growth_relative_directness(G, edge, sm_final=[], G_final=None, order=None):
-    """Get relative directness of the graph G. Works with growth.dynamic_growth."""
-    sm = get_shortest_network_path_length_matrix(G)
-    ids_to_delete = [ids for ids, node in enumerate(G_final.nodes) if node not in G]
-    sm_final_trimmed = np.delete(
-        np.delete(sm_final, ids_to_delete, 0), ids_to_delete, 1
-    )
+def growth_relative_directness(
+    G,
+    edge,
+    sm_final=[],
+    G_final=None,
+    order=None,
+    state=None,
+    distances=None,
+    node_index=None,
+):
+    """Get relative directness of the graph G. Works with growth.dynamic_growth. If the state of the growth is given, the tested graph is read from its arrays, and from the maintained distances if given. Else the final matrix is indexed with node_index, the row of each node of the final graph, in the order of the nodes of G."""
+    if state is not None:
+        sm = _tested_distances(state, distances)
+        sm_final_trimmed = submatrix(sm_final, state.node_ids(tested=True))
+    else:
+        sm = get_shortest_network_path_length_matrix(G)
+        if node_index is None:
+            node_index = get_node_index(G_final)
+        sm_final_trimmed = submatrix(sm_final, [node_index[node] for node in G])
     mat = _avoid_zerodiv_matrix(sm_final_trimmed, sm)
     # Mean directness on all non-null value, a null value means in different components or same node
     return np.sum(mat) / np.count_nonzero(mat)
 
 
-def prefunc_growth_relative_directness(G, G_final, order):
-    """Pre-compute the final shortesth network path length matrix of the graph."""
-    sm_final = get_shortest_network_path_length_matrix(G_final)
-    return {"sm_final": sm_final, "G_final": G_final, "order": order}
+def prefunc_growth_relative_directness(G, G_final, order, state=None, sm_final=None):
+    """Pre-compute the final shortesth network path length matrix of the graph, unless it is given, for instance when shared between trials, and the distances maintained during the growth."""
+    if sm_final is None:
+        sm_final = get_shortest_network_path_length_matrix(G_final)
+    return {
+        "sm_final": sm_final,
+        "G_final": G_final,
+        "order": order,
+        "state": state,
+        "distances": _init_distances(state, order),
+        "node_index": get_node_index(G_final) if state is None else None,
+    }
+
+
+def upfunc_growth_relative_directness(
+    G,
+    G_actual,
+    step,
+    sm_final=None,
+    G_final=None,
+    order=None,
+    state=None,
+    distances=None,
+    node_index=None,
+):
+    """Update the distances maintained during the growth with the chosen step."""
+    if distances is not None:
+        distances.apply(state, step)
+    return {
+        "sm_final": sm_final,
+        "G_final": G_final,
+        "order": order,
+        "state": state,
+        "distances": distances,
+        "node_index": node_index,
+    }
+
+
+def _init_distances(state, order):
+    """Return the structure maintaining the shortest network path lengths during the growth if there is one for this order, else None."""
+    if state is not None:
+        if order == "additive":
+            return IncrementalDistances(state)
+        elif order == "subtractive":
+            return DecrementalDistances(state)
+    return None
+
+
+def _tested_distances(state, distances=None):
+    """Get the matrix of shortest network path length of the tested graph of the state, from the maintained distances if given."""
+    if distances is not None:
+        return distances.tested_matrix(state)
+    return state.shortest_path_length_matrix(tested=True)
 
 
 # def growth_directness(G, edge, em=[]):
@@ -350,16 +661,45 @@ def upfunc_growth_overall_directness(
     }
 
 
-def growth_directness(G, edge):
-    """Get directness of the graph G, works with growth.dynamic_growth."""
-    mat = get_directness_matrix(G)
+def growth_directness(G, edge, state=None, distances=None, em_final=None):
+    """Get directness of the graph G, works with growth.dynamic_growth. If the state of the growth is given, the tested graph is read from its arrays, from the maintained distances if given, and from the euclidean distance matrix of the final graph if given."""
+    if state is not None:
+        node_ids = state.node_ids(tested=True)
+        if em_final is not None:
+            em = submatrix(em_final, node_ids)
+        else:
+            points = state.positions[node_ids]
+            em = scipy.spatial.distance.cdist(points, points, metric="euclidean")
+        mat = _avoid_zerodiv_matrix(em, _tested_distances(state, distances))
+    else:
+        mat = get_directness_matrix(G)
     # Mean directness on all non-null value, a null value means in different components or same node
     return np.sum(mat) / np.count_nonzero(mat)
 
 
-def directness(G):
-    """Get directness of the graph G."""
-    mat = get_directness_matrix(G)
+def prefunc_growth_directness(G, G_final, order, state=None, em_final=None):
+    """Pre-compute the euclidean distance matrix of the final graph, unless it is given, for instance when shared between trials, and the distances maintained during the growth."""
+    if em_final is None:
+        em_final = get_euclidean_distance_matrix(G_final)
+    return {
+        "state": state,
+        "distances": _init_distances(state, order),
+        "em_final": em_final,
+    }
+
+
+def upfunc_growth_directness(
+    G, G_actual, step, state=None, distances=None, em_final=None
+):
+    """Update the distances maintained during the growth with the chosen step."""
+    if distances is not None:
+        distances.apply(state, step)
+    return {"state": state, "distances": distances, "em_final": em_final}
+
+
+def directness(G, em=None):
+    """Get directness of the graph G. If em, the euclidean distance matrix of the nodes of G in the same order, is given it is not computed again."""
+    mat = get_directness_matrix(G, em=em)
     # Mean directness on all non-null value, a null value means in different components or same node
     return np.sum(mat) / np.count_nonzero(mat)
 
@@ -393,11 +733,12 @@ def sm_from_spm(G, spm, weight="length"):
     return [[nx.path_weight(G, path, weight=weight) for path in arr] for arr in spm]
 
 
-def get_directness_matrix(G, lonlat=False, weight="length"):
-    """Get the symmetrical directness matrix of a graph G. If lonlat is True, node positions are in geographic CRS."""
+def get_directness_matrix(G, lonlat=False, weight="length", em=None):
+    """Get the symmetrical directness matrix of a graph G. If lonlat is True, node positions are in geographic CRS. If em, the euclidean distance matrix of the nodes of G in the same order, is given it is not computed again."""
+    if em is None:
+        em = get_euclidean_distance_matrix(G, lonlat=lonlat)
     return _avoid_zerodiv_matrix(
-        get_euclidean_distance_matrix(G, lonlat=lonlat),
-        get_shortest_network_path_length_matrix(G, weight=weight),
+        em, get_shortest_network_path_length_matrix(G, weight=weight)
     )
 
 
@@ -500,6 +841,19 @@ def get_euclidean_distance_matrix_deprecated(G, lonlat=False):
     return np.array(euclidean_matrix)
 
 
+def get_node_index(G):
+    """Return the dictionary mapping each node of G to its row in the matrices of G, as get_shortest_network_path_length_matrix."""
+    return {node: idx for idx, node in enumerate(G.nodes)}
+
+
+def submatrix(mat, ids):
+    """Return the submatrix of mat on the rows and columns ids, with ids an array of row indices, without copying mat if ids are all its rows in order."""
+    ids = np.asarray(ids, dtype=np.int64)
+    if len(ids) == len(mat) and np.array_equal(ids, np.arange(len(mat))):
+        return mat
+    return mat[np.ix_(ids, ids)]
+
+
 def _avoid_zerodiv_matrix(num_mat, den_mat):
     """
     Divide one matrix by another while replacing numerator divided by 0 by 0.
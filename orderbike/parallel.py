@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Functions and classes to run the growth of a graph on multiple processes.
+"""
+
+import multiprocessing
+import os
+
+from .state import GrowthState, pack_kwargs, unpack_kwargs
+
+
+def get_n_jobs(n_jobs):
+    """Return the number of processes to use, with n_jobs being None or 1 for a serial run and negative values counting from the number of CPUs, as in scikit-learn."""
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max(os.cpu_count() + 1 + n_jobs, 1)
+    return max(n_jobs, 1)
+
+
+def split_chunks(values, num_chunks):
+    """Split a list into num_chunks contiguous chunks of sizes differing by at most one, keeping the order."""
+    size, extra = divmod(len(values), num_chunks)
+    chunks = []
+    start = 0
+    for idx in range(num_chunks):
+        end = start + size + (idx < extra)
+        chunks.append(values[start:end])
+        start = end
+    return chunks
+
+
+def _candidate_worker(
+    conn, G, order, init_edges, steps, metric_func, update_func, kwargs, batch_func
+):
+    """Loop of a worker process, keeping its own growth state in sync with the main process and computing the metric on the candidates it receives."""
+    state = GrowthState(G, order, init_edges)
+    # Steps already chosen before starting the worker, with kwargs already updated
+    for step in steps:
+        state.apply(step)
+    shared = {
+        "G": G,
+        "G_actual": state.graph(),
+        "H": state.graph(tested=True),
+        "state": state,
+    }
+    kwargs = unpack_kwargs(kwargs, shared)
+    # Error raised in the worker, sent back to the main process at the next evaluation
+    error = None
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        task, content = message
+        try:
+            if error is not None:
+                raise error
+            if task == "eval" and batch_func is not None:
+                conn.send(("ok", batch_func(G, content, **kwargs)))
+            elif task == "eval":
+                metric_vals = []
+                for edge in content:
+                    state.test(edge)
+                    metric_vals.append(metric_func(shared["H"], edge, **kwargs))
+                state.test(None)
+                conn.send(("ok", metric_vals))
+            elif task == "step":
+                state.apply(content)
+                if update_func is not None:
+                    kwargs = update_func(G, shared["G_actual"], content, **kwargs)
+        except Exception as err:
+            error = err
+            if task == "eval":
+                conn.send(("error", err))
+    conn.close()
+
+
+class CandidateEvaluator:
+    """
+    Pool of processes computing the metric on the candidate edges of a dynamic growth. Each worker receives the final graph and the pre-computed values once, then only the chosen step at each iteration, so that it can update its own state and pre-computed values with the update function.
+
+    Args:
+        n_jobs (int): Number of worker processes.
+        G (networkx.Graph): Final graph.
+        order (str): Either subtractive or additive.
+        init_edges (list): Initial edges of the growth.
+        metric_func (function): Function computing the metric on the tested graph.
+        update_func (function): Function updating the pre-computed values at each step, can be None.
+        precomp_kwargs (dict): Pre-computed values given to metric_func.
+        shared (dict): Objects of the main process, such as the state and the views on it, that each worker replace by its own.
+        steps (list, optional): Steps already chosen, for instance when resuming from a checkpoint, with precomp_kwargs already updated for them. Defaults to ().
+        batch_func (function, optional): Function computing the metric on all candidates of a worker at once from the final graph, used instead of metric_func if not None. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        n_jobs,
+        G,
+        order,
+        init_edges,
+        metric_func,
+        update_func,
+        precomp_kwargs,
+        shared,
+        steps=(),
+        batch_func=None,
+    ):
+        kwargs = pack_kwargs(precomp_kwargs, shared)
+        self._conns = []
+        self._processes = []
+        for _ in range(n_jobs):
+            parent_conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_candidate_worker,
+                args=(
+                    child_conn,
+                    G,
+                    order,
+                    init_edges,
+                    list(steps),
+                    metric_func,
+                    update_func,
+                    kwargs,
+                    batch_func,
+                ),
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._processes.append(process)
+
+    def evaluate(self, edges):
+        """Return the metric values for all edges, in the same order, by splitting them between the workers."""
+        chunks = split_chunks(list(edges), len(self._conns))
+        for conn, chunk in zip(self._conns, chunks):
+            conn.send(("eval", chunk))
+        metric_vals = []
+        errors = []
+        for conn in self._conns:
+            status, content = conn.recv()
+            if status == "error":
+                errors.append(content)
+            else:
+                metric_vals += content
+        if errors:
+            raise errors[0]
+        return metric_vals
+
+    def step(self, step):
+        """Send the chosen step to all workers."""
+        for conn in self._conns:
+            conn.send(("step", step))
+
+    def close(self):
+        """Stop all workers."""
+        for conn in self._conns:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            conn.close()
+        for process in self._processes:
+            process.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
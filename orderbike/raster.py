@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Classes to approximate the coverage of the buffered edges on a grid, for fast coverage growth of large graphs.
+"""
+
+import numpy as np
+import shapely
+
+from .utils import log
+
+
+class RasterCoverage:
+    """
+    Coverage of the buffered edges of a graph approximated on a grid of square cells, a cell being covered by an edge if its center is in the buffer of the edge. The number of edges covering each cell is kept, so that the area gained (resp. lost) when adding (resp. removing) an edge is the number of its cells covered by no edge (resp. only by itself) times the area of a cell, computed with NumPy sums over the cells of the edges.
+
+    A cell is misclassified only if the boundary of the buffer crosses it, so the error on the area of a buffer of perimeter P is at most sqrt(2) * P * resolution. The largest relative error and bound over all buffers are kept in error and bound, and logged, with a warning if the error is above the bound.
+
+    Args:
+        buffers (buffers.EdgeBuffers): Buffers of the edges of the final graph.
+        resolution (float, optional): Side of the cells. If None, a tenth of the size of the buffers. Defaults to None.
+        edges (list, optional): Edges covering the grid at the start. Defaults to ().
+    """
+
+    def __init__(self, buffers, resolution=None, edges=()):
+        if resolution is None:
+            resolution = buffers.buff_size / 10
+        self.resolution = resolution
+        self.cell_area = resolution**2
+        self.edge_index = buffers.edge_index
+        buffers = buffers.geoms
+        bounds = shapely.bounds(buffers)
+        origin = bounds[:, :2].min(axis=0)
+        first = ((bounds[:, :2] - origin) // resolution).astype(np.int64)
+        last = ((bounds[:, 2:] - origin) // resolution).astype(np.int64)
+        num_cols, num_rows = last.max(axis=0) + 1
+        cells = []
+        for buff, (col_min, row_min), (col_max, row_max) in zip(buffers, first, last):
+            cols, rows = np.meshgrid(
+                np.arange(col_min, col_max + 1), np.arange(row_min, row_max + 1)
+            )
+            shapely.prepare(buff)
+            inside = shapely.contains_xy(
+                buff,
+                origin[0] + (cols + 0.5) * resolution,
+                origin[1] + (rows + 0.5) * resolution,
+            )
+            cells.append(rows[inside] * num_cols + cols[inside])
+        self.indptr = np.zeros(len(cells) + 1, dtype=np.int64)
+        np.cumsum([len(c) for c in cells], out=self.indptr[1:])
+        self.indices = np.concatenate(cells).astype(np.int64)
+        self.counts = np.zeros(num_rows * num_cols, dtype=np.int32)
+        exact = shapely.area(buffers)
+        areas = np.diff(self.indptr) * self.cell_area
+        self.error = np.max(np.abs(areas - exact) / exact)
+        self.bound = np.max(np.sqrt(2) * shapely.length(buffers) * resolution / exact)
+        log.info(
+            f"Raster coverage with resolution {resolution}: relative error of the buffer areas is at most {self.error:.2%}, bounded by {self.bound:.2%}."
+        )
+        if self.error > self.bound:
+            log.warning(
+                f"Raster coverage with resolution {resolution}: relative error of the buffer areas {self.error:.2%} is above its bound {self.bound:.2%}."
+            )
+        self.reset(edges)
+
+    def reset(self, edges=()):
+        """Remove all edges from the grid, then add the edges."""
+        self.counts[:] = 0
+        self.num_covered = 0
+        for edge in edges:
+            self.add(edge)
+
+    @property
+    def area(self):
+        """Area covered by the edges added to the grid."""
+        return self.num_covered * self.cell_area
+
+    def _cells(self, edge):
+        idx = self.edge_index[tuple(edge)]
+        return self.indices[self.indptr[idx] : self.indptr[idx + 1]]
+
+    def add(self, edge):
+        """Add the cells of the buffer of edge to the covered cells."""
+        cells = self._cells(edge)
+        self.num_covered += np.count_nonzero(self.counts[cells] == 0)
+        self.counts[cells] += 1
+
+    def remove(self, edge):
+        """Remove the cells of the buffer of edge from the covered cells."""
+        cells = self._cells(edge)
+        self.counts[cells] -= 1
+        self.num_covered -= np.count_nonzero(self.counts[cells] == 0)
+
+    def extend(self, edges):
+        """Add the cells of the buffers of the edges to the covered cells."""
+        for edge in edges:
+            self.add(edge)
+
+    def _count_cells(self, edges, count):
+        """Return for each edge the area of its cells covered by count edges."""
+        ids = np.array([self.edge_index[tuple(edge)] for edge in edges], dtype=np.int64)
+        lengths = self.indptr[ids + 1] - self.indptr[ids]
+        starts = np.cumsum(lengths) - lengths
+        pos = np.repeat(self.indptr[ids] - starts, lengths) + np.arange(lengths.sum())
+        hits = self.counts[self.indices[pos]] == count
+        owners = np.repeat(np.arange(len(ids)), lengths)
+        return np.bincount(owners, weights=hits, minlength=len(ids)) * self.cell_area
+
+    def gained_areas(self, edges):
+        """Return for each edge not added to the grid the area it would add to the covered area."""
+        return self._count_cells(edges, 0)
+
+    def lost_areas(self, edges):
+        """Return for each edge added to the grid the area it would remove from the covered area."""
+        return self._count_cells(edges, 1)
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Classes to hold the metrics of a growth, computing them only when they are needed.
+"""
+
+from collections.abc import Mapping
+
+
+class LazyMetrics(Mapping):
+    """
+    Read-only dictionary of the metrics of a growth, with name of the metric as keys and values in order of growth as values, as returned by growth.compute_metrics. The values of a metric are computed on first access and kept, so that metrics never accessed are never computed. With LazyMetrics.items and LazyMetrics.values, all remaining metrics are computed together. Use dict to compute all of them, for instance to save them in a JSON file.
+
+    Args:
+        names (list): Names of the metrics.
+        compute (function): Function computing the values of a list of metrics, returning a dictionary with name of the metric as keys, that can have more metrics than the ones asked for, which are also kept.
+    """
+
+    def __init__(self, names, compute):
+        self.names = list(names)
+        self.compute = compute
+        self._values = {}
+
+    def __getitem__(self, name):
+        if name not in self.names:
+            raise KeyError(name)
+        if name not in self._values:
+            self._values.update(self.compute([name]))
+        return self._values[name]
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __repr__(self):
+        computed = [name for name in self.names if name in self._values]
+        return f"LazyMetrics({self.names}, computed={computed})"
+
+    def _compute_pending(self):
+        """Compute all metrics not computed yet with a single call of compute."""
+        pending = [name for name in self.names if name not in self._values]
+        if pending:
+            self._values.update(self.compute(pending))
+
+    def items(self):
+        self._compute_pending()
+        return super().items()
+
+    def values(self):
+        self._compute_pending()
+        return super().values()
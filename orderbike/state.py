@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Compact array representation of the state of a graph during its growth.
+"""
+
+import os
+import pickle
+
+import igraph as ig
+import networkx as nx
+import numpy as np
+
+from .utils import get_node_positions
+
+
+class GrowthState:
+    """
+    State of the growth of a graph, with integer ids for the nodes and edges of the final graph, a CSR adjacency, and a boolean mask over the edges telling which ones are present in the actual graph. A candidate edge is tested by flipping its bit in the mask instead of materialising a new graph.
+
+    Args:
+        G (networkx.Graph): Final graph.
+        order (str): Either subtractive or additive.
+        init_edges (list): Initial edges of the growth, see growth._init_edges.
+        weight (str, optional): Edge attribute used as weight for the shortest paths. Defaults to "length".
+    """
+
+    def __init__(self, G, order, init_edges, weight="length"):
+        self.G = G
+        self.order = order
+        self.nodes = list(G.nodes)
+        self.node_index = {node: idx for idx, node in enumerate(self.nodes)}
+        self.edges = list(G.edges)
+        self.edge_index = {}
+        for idx, edge in enumerate(self.edges):
+            self.edge_index[edge] = idx
+            self.edge_index.setdefault((edge[1], edge[0], *edge[2:]), idx)
+        self.edge_nodes = np.array(
+            [
+                [self.node_index[edge[0]], self.node_index[edge[1]]]
+                for edge in self.edges
+            ],
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        self.weights = np.array(
+            [G.edges[edge][weight] for edge in self.edges], dtype=float
+        )
+        self.positions = np.array(get_node_positions(G), dtype=float).reshape(-1, 2)
+        self._build_csr()
+        # igraph graph of the final graph built once, absent edges being ignored with an infinite weight
+        self._igraph = ig.Graph(n=len(self.nodes), edges=self.edge_nodes.tolist())
+        self.present = np.zeros(len(self.edges), dtype=bool)
+        self.degree = np.zeros(len(self.nodes), dtype=np.int64)
+        self.node_present = np.zeros(len(self.nodes), dtype=bool)
+        # Id of the edge flipped in the mask for the tested graph, -1 if none, and nodes it adds
+        self.tested = -1
+        self._tested_nodes = frozenset()
+        if order == "subtractive":
+            self.present[:] = True
+            np.add.at(self.degree, self.edge_nodes.ravel(), 1)
+            self.node_present[:] = True
+        elif order == "additive":
+            for edge in init_edges:
+                self._flip(self.edge_index[tuple(edge)])
+
+    def _build_csr(self):
+        """Build the CSR adjacency, where the neighbors of the node i and the edges linking them are in indices[indptr[i]:indptr[i+1]] and adj_edges[indptr[i]:indptr[i+1]]."""
+        num_edges = len(self.edges)
+        src = np.concatenate([self.edge_nodes[:, 0], self.edge_nodes[:, 1]])
+        dst = np.concatenate([self.edge_nodes[:, 1], self.edge_nodes[:, 0]])
+        eid = np.concatenate([np.arange(num_edges), np.arange(num_edges)])
+        sorter = np.argsort(src, kind="stable")
+        self.indptr = np.zeros(len(self.nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=len(self.nodes)), out=self.indptr[1:])
+        self.indices = dst[sorter]
+        self.adj_edges = eid[sorter]
+
+    def incident_edges(self, node_id):
+        """Return the ids of all edges of the final graph incident to the node."""
+        return self.adj_edges[self.indptr[node_id] : self.indptr[node_id + 1]]
+
+    def _flip(self, edge_id):
+        """Add or remove the edge from the actual graph, updating degrees and present nodes."""
+        ends = self.edge_nodes[edge_id]
+        if self.present[edge_id]:
+            self.present[edge_id] = False
+            np.subtract.at(self.degree, ends, 1)
+            # Remove isolated node from the graph
+            self.node_present[ends[self.degree[ends] == 0]] = False
+        else:
+            self.present[edge_id] = True
+            np.add.at(self.degree, ends, 1)
+            self.node_present[ends] = True
+
+    def apply(self, step):
+        """Remove or add the chosen step to the actual graph."""
+        self.test(None)
+        self._flip(self.edge_index[tuple(step)])
+
+    def test(self, edge):
+        """Set the edge to remove or add for the tested graph, None to test the actual graph."""
+        if edge is None:
+            self.tested = -1
+            self._tested_nodes = frozenset()
+            return
+        self.tested = self.edge_index[tuple(edge)]
+        # Removing an edge keep its nodes in the tested graph, adding one can add new nodes
+        if self.present[self.tested]:
+            self._tested_nodes = frozenset()
+        else:
+            self._tested_nodes = frozenset(self.edge_nodes[self.tested].tolist())
+
+    def edge_mask(self, tested=False):
+        """Return the boolean mask of the edges present in the actual graph, or in the tested graph if tested is True."""
+        if tested and self.tested >= 0:
+            mask = self.present.copy()
+            mask[self.tested] = not mask[self.tested]
+            return mask
+        return self.present
+
+    def node_mask(self, tested=False):
+        """Return the boolean mask of the nodes present in the actual graph, or in the tested graph if tested is True."""
+        if tested and self._tested_nodes:
+            mask = self.node_present.copy()
+            mask[list(self._tested_nodes)] = True
+            return mask
+        return self.node_present
+
+    def node_ids(self, tested=False):
+        """Return the ids of the present nodes, in the order of the nodes of the final graph."""
+        return np.flatnonzero(self.node_mask(tested=tested))
+
+    def edge_ids(self, tested=False):
+        """Return the ids of the present edges, in the order of the edges of the final graph."""
+        return np.flatnonzero(self.edge_mask(tested=tested))
+
+    def graph(self, tested=False):
+        """Return a networkx view of the actual graph, or of the tested graph if tested is True. The view follows the changes of the state without copying the final graph."""
+
+        def filter_node(node):
+            idx = self.node_index[node]
+            return bool(self.node_present[idx]) or (
+                tested and idx in self._tested_nodes
+            )
+
+        def filter_edge(*edge):
+            idx = self.edge_index[edge]
+            return bool(self.present[idx]) != (tested and idx == self.tested)
+
+        return nx.subgraph_view(
+            self.G, filter_node=filter_node, filter_edge=filter_edge
+        )
+
+    def shortest_path_length_matrix(self, tested=False):
+        """
+        Get the matrix of shortest network path length of the actual graph, or of the tested graph if tested is True, from the arrays of the state. See metrics.get_shortest_network_path_length_matrix.
+
+        Returns:
+            numpy.array: Matrix with a shape (N, N), with N being the number of present nodes, in the order of the nodes of the final graph.
+        """
+        node_ids = self.node_ids(tested=tested)
+        weights = np.where(self.edge_mask(tested=tested), self.weights, np.inf)
+        # All nodes of the final graph are present for most of a subtractive growth
+        vertices = None if len(node_ids) == len(self.nodes) else node_ids.tolist()
+        return np.array(
+            self._igraph.distances(
+                source=vertices, target=vertices, weights=weights, mode="all"
+            )
+        ).reshape(len(node_ids), len(node_ids))
+
+
+class _SharedObject:
+    """Placeholder for an object that each process builds on its own, such as the growth state and the views on it."""
+
+    def __init__(self, name):
+        self.name = name
+
+
+def pack_kwargs(kwargs, shared):
+    """Replace the values of kwargs that are shared objects by placeholders with their name, to pickle the kwargs."""
+    names = {id(obj): name for name, obj in shared.items()}
+    return {
+        key: _SharedObject(names[id(val)]) if id(val) in names else val
+        for key, val in kwargs.items()
+    }
+
+
+def unpack_kwargs(kwargs, shared):
+    """Replace the placeholders of shared objects in kwargs by the objects of this process."""
+    return {
+        key: shared[val.name] if isinstance(val, _SharedObject) else val
+        for key, val in kwargs.items()
+    }
+
+
+def save_checkpoint(filepath, checkpoint):
+    """Save a checkpoint of the growth as a pickle file, writing first to a temporary file so that a crash can't corrupt the last checkpoint."""
+    temp_filepath = f"{filepath}.tmp"
+    with open(temp_filepath, "wb") as f:
+        pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_filepath, filepath)
+
+
+def load_checkpoint(filepath):
+    """Load a checkpoint of the growth saved with save_checkpoint."""
+    with open(filepath, "rb") as f:
+        return pickle.load(f)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Graphs shared by the tests.
+"""
+
+import random
+
+import networkx as nx
+import pytest
+import shapely
+
+
+def grid_graph(
+    rows=4,
+    cols=4,
+    width=100,
+    built_frac=0.0,
+    jitter=0.0,
+    drop=0.0,
+    square=True,
+    seed=0,
+):
+    """
+    Make a grid graph with the attributes used by the growth: a geometry, a length and a built attribute for each edge, and the position of each node. A square of four edges far from the grid can be added as a second component, and a parallel edge is added to the first edge of the grid so that the graph has multiple edges.
+
+    Args:
+        rows (int, optional): Number of rows of nodes. Defaults to 4.
+        cols (int, optional): Number of columns of nodes. Defaults to 4.
+        width (float, optional): Distance between two neighboring nodes before jitter. Defaults to 100.
+        built_frac (float, optional): Probability of each edge to be built. Defaults to 0.
+        jitter (float, optional): Maximal random shift of the coordinates of the nodes. Defaults to 0.
+        drop (float, optional): Probability of each edge of the grid to be missing. Defaults to 0.
+        square (bool, optional): If True, add the square as a second component. Defaults to True.
+        seed (int, optional): Seed of the random number generator. Defaults to 0.
+
+    Returns:
+        networkx.MultiGraph: Grid graph.
+    """
+    rnd = random.Random(seed)
+    G = nx.MultiGraph(crs="epsg:2154")
+    for i in range(rows):
+        for j in range(cols):
+            G.add_node(
+                i * cols + j,
+                x=j * width + rnd.uniform(-jitter, jitter),
+                y=i * width + rnd.uniform(-jitter, jitter),
+            )
+    for i in range(rows):
+        for j in range(cols):
+            node = i * cols + j
+            if j < cols - 1 and rnd.random() >= drop:
+                G.add_edge(node, node + 1)
+            if i < rows - 1 and rnd.random() >= drop:
+                G.add_edge(node, node + cols)
+    if square:
+        nodes = [rows * cols + k for k in range(4)]
+        for k, node in enumerate(nodes):
+            G.add_node(node, x=10 * width + (k in [1, 2]) * width, y=(k >= 2) * width)
+        G.add_edges_from(zip(nodes, nodes[1:] + nodes[:1]))
+    for edge in list(G.edges):
+        u, v = edge[:2]
+        G.edges[edge]["geometry"] = shapely.LineString(
+            [(G.nodes[u]["x"], G.nodes[u]["y"]), (G.nodes[v]["x"], G.nodes[v]["y"])]
+        )
+    # Parallel edge going around the straight one
+    u, v = next(iter(G.edges()))
+    mid = ((G.nodes[u]["x"] + G.nodes[v]["x"]) / 2, G.nodes[u]["y"] + width / 3)
+    G.add_edge(
+        u,
+        v,
+        geometry=shapely.LineString(
+            [
+                (G.nodes[u]["x"], G.nodes[u]["y"]),
+                mid,
+                (G.nodes[v]["x"], G.nodes[v]["y"]),
+            ]
+        ),
+    )
+    for edge in G.edges:
+        G.edges[edge]["length"] = G.edges[edge]["geometry"].length
+        G.edges[edge]["built"] = int(rnd.random() < built_frac)
+    return G
+
+
+@pytest.fixture
+def make_grid():
+    """Return the function making grid graphs, see grid_graph."""
+    return grid_graph
@@ -1,8 +1,305 @@
-# TODO
-# import pytest
-# import orderbike
+# -*- coding: utf-8 -*-
+"""
+Tests of the growth, comparing the structures updated at each step to the brute-force computations they replace.
+"""
+
+import random
+import shutil
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from orderbike import growth, metrics
+from orderbike.connectivity import AdditiveFrontier, SubtractiveConnectivity
+from orderbike.state import GrowthState
+from orderbike.utils import spawn_seeds
+
+
+def brute_subtractive_invalid_edges(G, built=True):
+    """Find the invalid edges to remove from G by removing each edge from a copy of G and counting the components, as growth.get_subtractive_invalid_edges did before connectivity.SubtractiveConnectivity."""
+    invalid_edges = []
+    if built:
+        built_edges = [edge for edge in G.edges if G.edges[edge]["built"] == 1]
+        invalid_edges += built_edges
+        elected_nodes = growth.elect_nodes(G.edge_subgraph(built_edges))
+    init_num_cc = nx.number_connected_components(G)
+    for edge in G.edges:
+        H = G.copy()
+        H.remove_edge(*edge)
+        for node in edge[:2]:
+            if H.degree(node) == 0:
+                H.remove_node(node)
+        if nx.number_connected_components(H) > init_num_cc:
+            if built:
+                if G.edges[edge]["built"] != 1 and any(
+                    not any(node in cc for node in elected_nodes)
+                    for cc in nx.connected_components(H)
+                ):
+                    invalid_edges.append(edge)
+            else:
+                invalid_edges.append(edge)
+    return invalid_edges
+
+
+def brute_additive_invalid_edges(G_actual, G_final):
+    """Find the invalid edges to add to G_actual by making the subgraph of G_final with each edge and electing the nodes of its components, as growth.get_additive_invalid_edges did before connectivity.AdditiveFrontier."""
+    invalid_edges = [
+        edge
+        for edge in G_final.edges
+        if (not any(node in G_actual for node in edge[:2])) or edge in G_actual.edges
+    ]
+    if nx.number_connected_components(G_actual) >= nx.number_connected_components(
+        G_final
+    ):
+        return invalid_edges
+    updated_invalid_edges = invalid_edges.copy()
+    for edge in invalid_edges:
+        H = G_final.edge_subgraph(list(G_actual.edges) + [tuple(edge)])
+        if not any(
+            not any(node in cc for node in growth.elect_nodes(H))
+            for cc in nx.connected_components(G_final)
+        ):
+            updated_invalid_edges.remove(edge)
+    return updated_invalid_edges
+
+
+def valid_edges_at_each_step(G, built, order, steps):
+    """Yield the valid edges before each step of a connected growth of G, applying the steps one after the other."""
+    init_edges = growth._init_edges(G, built, order)
+    state = GrowthState(G, order, init_edges)
+    connectivity = growth._init_connectivity(G, state.graph(), built, True, order)
+    for step in steps:
+        yield connectivity.valid_edges()
+        state.apply(step)
+        connectivity.update(step)
+
+
+def linear_ranked_growth(G, ranking, built, order):
+    """Find the order of a connected growth following a ranking by scanning the whole ranking for the first valid edge at each step, as growth.order_ranked_network_growth did before growth._ranked_connected_growth."""
+    ranking = list(ranking)
+    if order == "subtractive":
+        ranking.reverse()
+    init_edges = growth._init_edges(G, built, order)
+    state = GrowthState(G, order, init_edges)
+    connectivity = growth._init_connectivity(G, state.graph(), built, True, order)
+    order_growth = []
+    for _ in range(len(G.edges) - len(init_edges)):
+        valid_edges = connectivity.valid_edges()
+        step = next(edge for edge in ranking if edge in valid_edges)
+        ranking.remove(step)
+        state.apply(step)
+        connectivity.update(step)
+        order_growth.append(step)
+    if order == "subtractive":
+        order_growth.reverse()
+    return order_growth
 
 
 class TestGrowth:
-    def test_dynamic_growth():
-        pass
+    @pytest.mark.parametrize("built", [True, False])
+    @pytest.mark.parametrize("seed", range(4))
+    def test_subtractive_connectivity(self, make_grid, built, seed):
+        G = make_grid(built_frac=0.25 * built, drop=0.15, seed=seed)
+        G_actual = G.copy()
+        connectivity = SubtractiveConnectivity(G_actual, built=built)
+        rnd = random.Random(seed)
+        while True:
+            invalid_edges = brute_subtractive_invalid_edges(G_actual, built=built)
+            assert connectivity.invalid_edges() == invalid_edges
+            assert growth.get_subtractive_invalid_edges(G_actual, built) == (
+                invalid_edges
+            )
+            valid_edges = [edge for edge in G_actual.edges if edge not in invalid_edges]
+            assert connectivity.valid_edges() == valid_edges
+            if not valid_edges:
+                break
+            step = rnd.choice(valid_edges)
+            G_actual.remove_edge(*step)
+            for node in step[:2]:
+                if G_actual.degree(node) == 0:
+                    G_actual.remove_node(node)
+            connectivity.update(step)
+
+    @pytest.mark.parametrize("init", ["empty", "built", "edge"])
+    @pytest.mark.parametrize("seed", range(4))
+    def test_additive_frontier(self, make_grid, init, seed):
+        G = make_grid(built_frac=0.2, drop=0.25, seed=seed)
+        rnd = random.Random(seed)
+        if init == "empty":
+            actual_edges = []
+        elif init == "built":
+            actual_edges = [edge for edge in G.edges if G.edges[edge]["built"] == 1]
+        else:
+            actual_edges = [rnd.choice(list(G.edges))]
+        frontier = AdditiveFrontier(G, G.edge_subgraph(actual_edges))
+        while True:
+            G_actual = G.edge_subgraph(actual_edges)
+            invalid_edges = brute_additive_invalid_edges(G_actual, G)
+            assert frontier.invalid_edges() == invalid_edges
+            assert growth.get_additive_invalid_edges(G_actual, G) == invalid_edges
+            valid_edges = [edge for edge in G.edges if edge not in invalid_edges]
+            assert frontier.valid_edges() == valid_edges
+            if not valid_edges:
+                break
+            step = rnd.choice(valid_edges)
+            actual_edges.append(step)
+            frontier.update(step)
+
+    @pytest.mark.parametrize(
+        "metric", ["coverage", "adaptive_coverage", "directness", "relative_directness"]
+    )
+    @pytest.mark.parametrize("order", ["subtractive", "additive"])
+    @pytest.mark.parametrize("jitter", [0, 20])
+    def test_parallel_growth(self, make_grid, metric, order, jitter):
+        # The directness is not defined for the tested graphs of a graph with two components
+        G = make_grid(jitter=jitter, drop=0.1, square=False)
+        kwargs = dict(
+            built=False,
+            order=order,
+            metric=metric,
+            progress_bar=False,
+            save_metrics=False,
+            seed=0,
+        )
+        serial = growth.order_dynamic_network_growth(G, **kwargs)
+        assert growth.order_dynamic_network_growth(G, n_jobs=2, **kwargs) == serial
+
+    @pytest.mark.parametrize("metric", ["coverage", "adaptive_coverage"])
+    @pytest.mark.parametrize("order", ["subtractive", "additive"])
+    @pytest.mark.parametrize("jitter", [0, 20])
+    def test_lazy_growth(self, make_grid, metric, order, jitter):
+        G = make_grid(jitter=jitter, drop=0.1)
+        kwargs = dict(
+            built=False,
+            order=order,
+            metric=metric,
+            progress_bar=False,
+            save_metrics=False,
+            seed=0,
+        )
+        exhaustive = growth.order_dynamic_network_growth(G, **kwargs)
+        assert growth.order_dynamic_network_growth(G, lazy=True, **kwargs) == (
+            exhaustive
+        )
+
+    @pytest.mark.parametrize(
+        "metric, lazy",
+        [("coverage", False), ("coverage", True), ("relative_directness", False)],
+    )
+    @pytest.mark.parametrize("order", ["subtractive", "additive"])
+    def test_resume_growth(self, make_grid, monkeypatch, tmp_path, metric, lazy, order):
+        # The relative directness is not defined for the tested graphs of a graph with two components
+        G = make_grid(drop=0.1, square=False)
+        kwargs = dict(
+            built=False,
+            order=order,
+            metric=metric,
+            lazy=lazy,
+            progress_bar=False,
+            save_metrics=False,
+            seed=0,
+        )
+        uninterrupted = growth.order_dynamic_network_growth(G, **kwargs)
+        # Keep a copy of each checkpoint to resume from the middle of the growth
+        copies = []
+        save_checkpoint = growth.save_checkpoint
+
+        def save_copy(filepath, checkpoint):
+            save_checkpoint(filepath, checkpoint)
+            copies.append(tmp_path / f"checkpoint_{len(copies)}.pkl")
+            shutil.copy(filepath, copies[-1])
+
+        monkeypatch.setattr(growth, "save_checkpoint", save_copy)
+        checkpointed = growth.order_dynamic_network_growth(
+            G, checkpoint=tmp_path / "checkpoint.pkl", **kwargs
+        )
+        assert checkpointed == uninterrupted
+        resumed = growth.order_dynamic_network_growth(
+            G, resume_from=copies[len(copies) // 2], **kwargs
+        )
+        assert resumed == uninterrupted
+
+    @pytest.mark.parametrize(
+        "growth_func, kwargs",
+        [
+            (
+                growth.order_ranked_network_growth,
+                {"ranking_func": metrics.growth_random},
+            ),
+            (
+                growth.order_ranked_network_growth,
+                {"ranking_func": metrics.growth_betweenness},
+            ),
+            (
+                growth.order_dynamic_network_growth,
+                {"metric": "coverage", "progress_bar": False},
+            ),
+        ],
+    )
+    @pytest.mark.parametrize("order", ["subtractive", "additive"])
+    def test_seeded_growth(self, make_grid, growth_func, kwargs, order):
+        # Regular grid, where many edges have the same value
+        G = make_grid(drop=0.1)
+        orders = [
+            growth_func(
+                G, built=False, order=order, save_metrics=False, seed=seed, **kwargs
+            )
+            for seed in [0, 0] + spawn_seeds(0, 2) * 2
+        ]
+        assert orders[0] == orders[1]
+        assert orders[2:4] == orders[4:6]
+
+    @pytest.mark.parametrize("order", ["subtractive", "additive"])
+    @pytest.mark.parametrize("built", [True, False])
+    @pytest.mark.parametrize("seed", range(3))
+    def test_ranked_random_growth(self, make_grid, order, built, seed):
+        G = make_grid(built_frac=0.2 * built, jitter=20, drop=0.15, seed=seed)
+        order_growth = growth.order_ranked_network_growth(
+            G, built=built, order=order, save_metrics=False, seed=seed
+        )
+        ranking = metrics.growth_random(G, rng=np.random.default_rng(seed))
+        assert order_growth == linear_ranked_growth(G, ranking, built, order)
+
+    @pytest.mark.parametrize(
+        "ranking_func", [metrics.growth_betweenness, metrics.growth_closeness]
+    )
+    @pytest.mark.parametrize("order", ["subtractive", "additive"])
+    @pytest.mark.parametrize("built", [True, False])
+    def test_ranked_growth(self, make_grid, ranking_func, order, built):
+        G = make_grid(built_frac=0.2 * built, drop=0.15)
+        order_growth = growth.order_ranked_network_growth(
+            G,
+            built=built,
+            order=order,
+            ranking_func=ranking_func,
+            save_metrics=False,
+            seed=0,
+        )
+        # Each step is a valid edge with the best value, ties being broken at random
+        sgn = -1 if order == "subtractive" else 1
+        values = {tuple(edge): sgn * met for edge, met in ranking_func(G)}
+        steps = [tuple(edge) for edge in order_growth]
+        if order == "subtractive":
+            steps.reverse()
+        for step, valid_edges in zip(
+            steps, valid_edges_at_each_step(G, built, order, steps)
+        ):
+            assert step in valid_edges
+            assert values[step] == max(values[edge] for edge in valid_edges)
+
+    def test_growth_random(self, make_grid):
+        G = make_grid()
+        ranking = metrics.growth_random(G, rng=np.random.default_rng(0))
+        assert metrics.growth_random(G, rng=np.random.default_rng(0)) == ranking
+        assert metrics.growth_random(G, rng=np.random.default_rng(1)) != ranking
+        assert sorted(ranking) == sorted(G.edges)
+
+    @pytest.mark.parametrize("order", ["subtractive", "additive"])
+    def test_dynamic_growth(self, make_grid, order):
+        G = make_grid(built_frac=0.2, jitter=20)
+        order_growth = growth.order_dynamic_network_growth(
+            G, order=order, progress_bar=False, save_metrics=False
+        )
+        not_built = [edge for edge in G.edges if G.edges[edge]["built"] == 0]
+        assert sorted(order_growth) == sorted(not_built)
@@ -1,8 +1,341 @@
-# TODO
-# import pytest
-# import orderbike
+# -*- coding: utf-8 -*-
+"""
+Tests of the metrics, comparing the values updated at each step to a full computation.
+"""
+
+import collections
+import logging
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+import shapely
+
+from orderbike import growth, metrics
+from orderbike.buffers import EdgeBuffers
+from orderbike.distances import DecrementalDistances, IncrementalDistances
+from orderbike.raster import RasterCoverage
+from orderbike.state import GrowthState
+
+
+def plain_coverage_values(G, actual_edges, edges, order, buff_size, actual_area=None):
+    """Compute the coverage value of adding or removing each edge of the actual edges, as the difference between the area of the union of the buffers with or without the edge and the area of the actual edges, or actual_area if given, divided by the length of the edge."""
+
+    def area(edgelist):
+        return shapely.union_all(
+            [G.edges[edge]["geometry"].buffer(buff_size) for edge in edgelist]
+        ).area
+
+    if actual_area is None:
+        actual_area = area(actual_edges)
+    if order == "subtractive":
+        new_areas = [
+            area([other for other in actual_edges if other != edge]) for edge in edges
+        ]
+    else:
+        new_areas = [area(actual_edges + [edge]) for edge in edges]
+    return [
+        (new_area - actual_area) / G.edges[edge]["length"]
+        for edge, new_area in zip(edges, new_areas)
+    ]
+
+
+def plain_metrics(G, order_growth, built=False, buff_size=200):
+    """Compute the metrics of an order by building the actual graph and computing all metrics again at each step, as growth.compute_metrics did before updating them."""
+    if built:
+        actual_edges = [edge for edge in G.edges if G.edges[edge]["built"] == 1]
+    else:
+        actual_edges = [next(edge for edge in G.edges if edge not in order_growth)]
+    fsm = metrics.get_shortest_network_path_length_matrix(G)
+    node_index = metrics.get_node_index(G)
+    metrics_dict = {
+        key: []
+        for key in [
+            "xx",
+            "coverage",
+            "directness",
+            "relative_directness",
+            "num_cc",
+            "length_lcc",
+        ]
+    }
+    for step in [None] + list(order_growth):
+        if step is not None:
+            actual_edges.append(step)
+        G_actual = G.edge_subgraph(actual_edges)
+        metrics_dict["xx"].append(sum(G.edges[edge]["length"] for edge in actual_edges))
+        metrics_dict["coverage"].append(
+            shapely.union_all(
+                [G.edges[edge]["geometry"].buffer(buff_size) for edge in actual_edges]
+            ).area
+        )
+        metrics_dict["directness"].append(metrics.directness(G_actual))
+        ids = [node_index[node] for node in G_actual.nodes]
+        mat = metrics._avoid_zerodiv_matrix(
+            fsm[np.ix_(ids, ids)],
+            metrics.get_shortest_network_path_length_matrix(G_actual),
+        )
+        metrics_dict["relative_directness"].append(np.sum(mat) / np.count_nonzero(mat))
+        components = list(nx.connected_components(G_actual))
+        metrics_dict["num_cc"].append(len(components))
+        metrics_dict["length_lcc"].append(
+            max(G_actual.subgraph(comp).size(weight="length") for comp in components)
+        )
+    return metrics_dict
+
+
+def growth_order(G, built, seed):
+    """Return a random order of growth of G, of all edges except the built ones or except one edge."""
+    if built:
+        edges = [edge for edge in G.edges if G.edges[edge]["built"] == 0]
+    else:
+        edges = list(G.edges)[1:]
+    random.Random(seed).shuffle(edges)
+    return edges
 
 
 class TestMetrics:
-    def test_coverage():
-        pass
+    @pytest.mark.parametrize("built", [True, False])
+    @pytest.mark.parametrize("seed", range(3))
+    def test_incremental_distances(self, make_grid, built, seed):
+        G = make_grid(built_frac=0.2 * built, jitter=20, drop=0.1, seed=seed)
+        init_edges = growth._init_edges(G, built, "additive")
+        state = GrowthState(G, "additive", init_edges)
+        connectivity = growth._init_connectivity(
+            G, state.graph(), built, True, "additive"
+        )
+        distances = IncrementalDistances(state)
+        rnd = random.Random(seed)
+        while True:
+            valid_edges = connectivity.valid_edges()
+            if not valid_edges:
+                break
+            for edge in valid_edges:
+                state.test(edge)
+                np.testing.assert_allclose(
+                    distances.tested_matrix(state),
+                    metrics.get_shortest_network_path_length_matrix(
+                        state.graph(tested=True)
+                    ),
+                    rtol=1e-12,
+                )
+            step = rnd.choice(valid_edges)
+            state.apply(step)
+            connectivity.update(step)
+            distances.apply(state, step)
+            node_ids = state.node_ids()
+            np.testing.assert_allclose(
+                distances.matrix[np.ix_(node_ids, node_ids)],
+                metrics.get_shortest_network_path_length_matrix(state.graph()),
+                rtol=1e-12,
+            )
+
+    @pytest.mark.parametrize("jitter", [0, 20])
+    @pytest.mark.parametrize("built", [True, False])
+    @pytest.mark.parametrize("seed", range(3))
+    def test_decremental_distances(self, make_grid, jitter, built, seed):
+        G = make_grid(built_frac=0.2 * built, jitter=jitter, drop=0.1, seed=seed)
+        init_edges = growth._init_edges(G, built, "subtractive")
+        state = GrowthState(G, "subtractive", init_edges)
+        connectivity = growth._init_connectivity(
+            G, state.graph(), built, True, "subtractive"
+        )
+        distances = DecrementalDistances(state)
+        rnd = random.Random(seed)
+        while True:
+            valid_edges = connectivity.valid_edges()
+            if not valid_edges:
+                break
+            # Only the pairs through the removed edge are computed again, with the same sums, so the values are exactly equal
+            # The matrix is computed from the state since the last tested graph has no edge
+            for edge in valid_edges:
+                state.test(edge)
+                np.testing.assert_array_equal(
+                    distances.tested_matrix(state),
+                    state.shortest_path_length_matrix(tested=True),
+                )
+            step = rnd.choice(valid_edges)
+            state.apply(step)
+            connectivity.update(step)
+            distances.apply(state, step)
+            node_ids = state.node_ids()
+            np.testing.assert_array_equal(
+                distances.matrix[np.ix_(node_ids, node_ids)],
+                state.shortest_path_length_matrix(),
+            )
+
+    @pytest.mark.parametrize("built", [True, False])
+    @pytest.mark.parametrize("seed", range(2))
+    def test_compute_metrics(self, make_grid, built, seed):
+        # The relative directness is not defined if the final graph has two components
+        G = make_grid(built_frac=0.2 * built, jitter=20, square=False, seed=seed)
+        order_growth = growth_order(G, built, seed)
+        expected = plain_metrics(G, order_growth, built=built)
+        metrics_dict = growth.compute_metrics(G, order_growth, built=built)
+        assert list(metrics_dict) == list(expected)
+        for key in expected:
+            np.testing.assert_allclose(metrics_dict[key], expected[key], rtol=1e-9)
+
+    @pytest.mark.parametrize("n_jobs", [1, 2])
+    def test_compute_metrics_batch(self, make_grid, n_jobs):
+        G = make_grid(built_frac=0.2, jitter=20, square=False)
+        orders = [growth_order(G, True, seed) for seed in range(3)]
+        metrics_batch = growth.compute_metrics_batch(
+            G, orders, built=True, n_jobs=n_jobs
+        )
+        for row, order_growth in enumerate(orders):
+            metrics_dict = growth.compute_metrics(G, order_growth, built=True)
+            assert list(metrics_batch) == list(metrics_dict)
+            for key in metrics_dict:
+                np.testing.assert_allclose(
+                    metrics_batch[key][row], metrics_dict[key], rtol=1e-9
+                )
+        with pytest.raises(ValueError):
+            growth.compute_metrics_batch(G, [orders[0], orders[1][1:]], built=True)
+
+    @pytest.mark.parametrize("sample", [{"sample_every": 4}, {"sample_length": 500}])
+    def test_sampled_metrics(self, make_grid, sample):
+        G = make_grid(jitter=20, square=False)
+        order_growth = growth_order(G, False, 0)
+        expected = growth.compute_metrics(G, order_growth)
+        metrics_dict = growth.compute_metrics(G, order_growth, **sample)
+        sampled = ~np.isnan(metrics_dict["coverage"])
+        assert sampled[0] and sampled[-1] and not sampled.all()
+        if "sample_every" in sample:
+            steps = list(range(0, len(order_growth) + 1, sample["sample_every"]))
+            assert set(np.flatnonzero(sampled)) == set(steps + [len(order_growth)])
+        for key in expected:
+            values = np.array(metrics_dict[key])
+            if growth.METRIC_EVALUATORS.get(key, {}).get("sampled"):
+                assert np.array_equal(np.isnan(values), ~sampled)
+                np.testing.assert_allclose(
+                    values[sampled], np.array(expected[key])[sampled], rtol=1e-9
+                )
+            else:
+                np.testing.assert_array_equal(values, expected[key])
+
+    @pytest.mark.parametrize(
+        "sample",
+        [
+            {"sample_every": 0},
+            {"sample_every": -2},
+            {"sample_length": 0},
+            {"sample_length": -100},
+            {"sample_every": 4, "sample_length": 500},
+        ],
+    )
+    def test_invalid_sample(self, make_grid, sample):
+        G = make_grid(square=False)
+        with pytest.raises(ValueError):
+            growth.compute_metrics(G, growth_order(G, False, 0), **sample)
+
+    @pytest.mark.parametrize("sample_every", [None, 4])
+    def test_parallel_metrics(self, make_grid, sample_every):
+        G = make_grid(built_frac=0.2, jitter=20, square=False)
+        order_growth = growth_order(G, True, 0)
+        expected = growth.compute_metrics(
+            G, order_growth, built=True, sample_every=sample_every
+        )
+        metrics_dict = growth.compute_metrics(
+            G, order_growth, built=True, sample_every=sample_every, n_jobs=3
+        )
+        assert list(metrics_dict) == list(expected)
+        for key in expected:
+            np.testing.assert_allclose(metrics_dict[key], expected[key], rtol=1e-9)
+
+    def test_selected_metrics(self, make_grid):
+        G = make_grid(jitter=20, square=False)
+        order_growth = growth_order(G, False, 0)
+        expected = growth.compute_metrics(G, order_growth)
+        metrics_dict = growth.compute_metrics(
+            G, order_growth, metrics=["coverage", "num_cc"]
+        )
+        assert list(metrics_dict) == ["xx", "coverage", "num_cc"]
+        lazy_metrics = growth.compute_metrics(G, order_growth, lazy=True)
+        assert list(lazy_metrics) == list(expected)
+        for key in metrics_dict:
+            np.testing.assert_array_equal(metrics_dict[key], expected[key])
+        for key in expected:
+            np.testing.assert_array_equal(lazy_metrics[key], expected[key])
+        with pytest.raises(ValueError):
+            growth.compute_metrics(G, order_growth, metrics=["unknown"])
+
+    def test_lazy_metrics(self, make_grid, monkeypatch):
+        G = make_grid(jitter=20, square=False)
+        order_growth = growth_order(G, False, 0)
+        calls = collections.Counter()
+
+        def counted(name, func):
+            def evaluate(*args, **kwargs):
+                calls[name] += 1
+                return func(*args, **kwargs)
+
+            return evaluate
+
+        for name, evaluator in growth.METRIC_EVALUATORS.items():
+            monkeypatch.setitem(evaluator, "func", counted(name, evaluator["func"]))
+        lazy_metrics = growth.compute_metrics(G, order_growth, lazy=True)
+        lazy_metrics["xx"]
+        lazy_metrics["coverage"]
+        assert calls["coverage"] == len(order_growth) + 1
+        assert calls["directness"] == calls["relative_directness"] == 0
+        dict(lazy_metrics)
+        assert set(calls) == set(growth.METRIC_EVALUATORS)
+
+    @pytest.mark.parametrize("resolution", [None, 40])
+    @pytest.mark.parametrize("jitter", [0, 20])
+    def test_raster_coverage(self, make_grid, caplog, resolution, jitter):
+        G = make_grid(jitter=jitter, drop=0.1)
+        with caplog.at_level(logging.INFO, logger="orderbike"):
+            raster = RasterCoverage(EdgeBuffers(G, 150), resolution, edges=G.edges)
+        assert raster.error <= raster.bound
+        assert [record.levelno for record in caplog.records] == [logging.INFO]
+
+    @pytest.mark.parametrize("order", ["subtractive", "additive"])
+    @pytest.mark.parametrize("built", [True, False])
+    @pytest.mark.parametrize("seed", range(3))
+    def test_coverage(self, make_grid, order, built, seed):
+        G = make_grid(built_frac=0.2 * built, jitter=20, drop=0.1, seed=seed)
+        buff_size = 150
+        init_edges = growth._init_edges(G, built, order)
+        state = GrowthState(G, order, init_edges)
+        G_actual = state.graph()
+        connectivity = growth._init_connectivity(G, G_actual, built, True, order)
+        precomp = metrics.prefunc_growth_coverage(
+            G_actual, G, order, buff_size=buff_size
+        )
+        rnd = random.Random(seed)
+        while True:
+            valid_edges = connectivity.valid_edges()
+            if not valid_edges:
+                break
+            # The subtractive values are differences with the area of the initial graph, kept in the pre-computed values
+            actual_area = precomp["actual_area"] if order == "subtractive" else None
+            values = metrics.growth_coverage_batch(G, valid_edges, **precomp)
+            # The values kept in the cache from the previous steps are the values computed again without it
+            np.testing.assert_allclose(
+                values,
+                metrics.growth_coverage_batch(
+                    G, valid_edges, **dict(precomp, area_cache=None)
+                ),
+                rtol=1e-7,
+                atol=1e-6,
+            )
+            np.testing.assert_allclose(
+                values,
+                plain_coverage_values(
+                    G,
+                    list(G_actual.edges),
+                    valid_edges,
+                    order,
+                    buff_size,
+                    actual_area=actual_area,
+                ),
+                rtol=1e-7,
+                atol=1e-6,
+            )
+            step = rnd.choice(valid_edges)
+            state.apply(step)
+            connectivity.update(step)
+            precomp = metrics.upfunc_growth_coverage(G, G_actual, step, **precomp)
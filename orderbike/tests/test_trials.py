@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the trials, comparing the results on multiple processes or with a memo to the results of independent serial runs.
+"""
+
+import json
+import sys
+
+import pytest
+
+from orderbike import growth
+from orderbike.trials import JSONFolderSink, memoized_trials, run_trials
+from orderbike.utils import spawn_seeds
+
+JOBS = [
+    ("coverage", "additive", {"built": False, "save_metrics": False}, 2),
+    # Job using the final shortest network path length matrix in shared memory
+    ("relative_directness", "subtractive", {"built": False, "save_metrics": False}, 2),
+    ("random", "additive", {"built": True}, 3),
+]
+
+
+class TestTrials:
+    # The shared memory blocks of the workers are untracked, which needs Python 3.13
+    @pytest.mark.skipif(sys.version_info < (3, 13), reason="requires Python 3.13")
+    @pytest.mark.parametrize("use_sink", [False, True])
+    def test_run_trials(self, make_grid, use_sink):
+        # The relative directness is not defined for the tested graphs of a graph with two components
+        G = make_grid(built_frac=0.2, jitter=20, drop=0.1, square=False)
+        expected = run_trials(G, JOBS, n_jobs=1, seed=0)
+        assert [(result["job"], result["trial"]) for result in expected] == [
+            (0, 0),
+            (0, 1),
+            (1, 0),
+            (1, 1),
+            (2, 0),
+            (2, 1),
+            (2, 2),
+        ]
+        if use_sink:
+            results = []
+            assert run_trials(G, JOBS, sink=results.append, n_jobs=3, seed=0) == []
+            results.sort(key=lambda result: (result["job"], result["trial"]))
+        else:
+            results = run_trials(G, JOBS, n_jobs=3, seed=0)
+        assert results == expected
+        assert run_trials(G, JOBS, n_jobs=1, seed=1) != expected
+
+    def test_json_folder_sink(self, make_grid, tmp_path):
+        G = make_grid(built_frac=0.2, jitter=20, drop=0.1, square=False)
+        jobs = [JOBS[0], JOBS[2]]
+        expected = run_trials(G, jobs, n_jobs=1, seed=0)
+        run_trials(G, jobs, sink=JSONFolderSink(tmp_path), n_jobs=1, seed=0)
+        assert sorted(
+            str(path.relative_to(tmp_path)) for path in tmp_path.rglob("*.json")
+        ) == [
+            "coverage_additive_connected/order_growth_0.json",
+            "coverage_additive_connected/order_growth_1.json",
+            "random_additive_connected_built/metrics_growth_0.json",
+            "random_additive_connected_built/metrics_growth_1.json",
+            "random_additive_connected_built/metrics_growth_2.json",
+            "random_additive_connected_built/order_growth_0.json",
+            "random_additive_connected_built/order_growth_1.json",
+            "random_additive_connected_built/order_growth_2.json",
+        ]
+        for result in expected:
+            foldername = tmp_path / (
+                "coverage_additive_connected"
+                if result["job"] == 0
+                else "random_additive_connected_built"
+            )
+            with open(foldername / f"order_growth_{result['trial']}.json") as f:
+                assert json.load(f) == [list(edge) for edge in result["order_growth"]]
+            if result["metrics_dict"] is not None:
+                with open(foldername / f"metrics_growth_{result['trial']}.json") as f:
+                    assert json.load(f) == json.loads(
+                        json.dumps(result["metrics_dict"])
+                    )
+
+    @pytest.mark.parametrize("order", ["subtractive", "additive"])
+    def test_memoized_trials(self, make_grid, order):
+        # Regular grid, where many edges have the same value so that trials break ties differently
+        G = make_grid(drop=0.1)
+        kwargs = {"built": False, "save_metrics": False}
+        results = list(memoized_trials(G, "coverage", order, kwargs, 3, seed=5))
+        expected = run_trials(G, [("coverage", order, kwargs, 3)], n_jobs=1, seed=5)
+        assert [
+            {key: val for key, val in result.items() if key != "deterministic"}
+            for result in results
+        ] == expected
+        assert len({tuple(result["order_growth"]) for result in results}) > 1
+        trial_seeds = spawn_seeds(spawn_seeds(5, 1)[0], 3)
+        for result, trial_seed in zip(results, trial_seeds):
+            assert result["order_growth"] == growth.order_dynamic_network_growth(
+                G,
+                order=order,
+                metric="coverage",
+                progress_bar=False,
+                seed=trial_seed,
+                **kwargs,
+            )
@@ -1,8 +1,19 @@
-# TODO
-# import pytest
-# import orderbike
+# -*- coding: utf-8 -*-
+"""
+Tests of the utility functions.
+"""
+
+from orderbike.utils import spawn_seeds
 
 
 class TestUtils:
-    def test_add_edge_attr_from_dict():
+    def test_add_edge_attr_from_dict(self):
+        # TODO
         pass
+
+    def test_spawn_seeds(self):
+        states = [seed.generate_state(4).tolist() for seed in spawn_seeds(0, 3)]
+        assert len({tuple(state) for state in states}) == 3
+        # The seed of a trial only depends on the seed and the index of the trial
+        more_states = [seed.generate_state(4).tolist() for seed in spawn_seeds(0, 5)]
+        assert more_states[:3] == states
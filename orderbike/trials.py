@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+Functions to run multiple trials of growth strategies on the same graph in parallel.
+"""
+
+import json
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from . import growth, metrics
+from .parallel import get_n_jobs
+from .utils import log, spawn_seeds
+
+__all__ = [
+    "run_trials",
+    "memoized_trials",
+    "JSONFolderSink",
+    "TieMemo",
+]
+
+
+RANKING_FUNCS = {
+    "random": metrics.growth_random,
+    "betweenness": metrics.growth_betweenness,
+    "closeness": metrics.growth_closeness,
+}
+
+# Graph, jobs and shared arrays of a worker process, set once by _init_trial_worker
+_TRIAL_CONTEXT = {}
+
+
+def run_trials(G, jobs, sink=None, n_jobs=-1, seed=None):
+    """
+    Run multiple trials of growth strategies on the same graph on a pool of processes. The graph is sent once to each process, and the final shortest network path length and euclidean distance matrices through shared memory, and each trial has its own seed from utils.spawn_seeds so results don't depend on the number of processes.
+
+    Args:
+        G (networkx.Graph): Final graph.
+        jobs (list): List of (strategy, order, kwargs, n_trials). The strategy is either the name of a metric for growth.order_dynamic_network_growth, the name of a ranking in RANKING_FUNCS or a ranking function for growth.order_ranked_network_growth. The kwargs are given to the growth function.
+        sink (function, optional): Function called on the result of each trial as soon as it is finished, for instance a JSONFolderSink. If None, the results are returned. Defaults to None.
+        n_jobs (int, optional): Number of processes, -1 to use all CPUs. Defaults to -1.
+        seed (int or numpy.random.SeedSequence, optional): Seed of all the trials. Defaults to None.
+
+    Returns:
+        list: If sink is None, list of the results of all trials in the order of the jobs, else an empty list. Each result is a dictionary with the index of the job, the strategy, order, kwargs, the trial, the number of trials of the job, the order of growth and the metrics dictionary, None if save_metrics is False.
+    """
+    jobs = [tuple(job) for job in jobs]
+    tasks = []
+    for job_idx, (job_seed, job) in enumerate(zip(spawn_seeds(seed, len(jobs)), jobs)):
+        for trial, trial_seed in enumerate(spawn_seeds(job_seed, job[3])):
+            tasks.append((job_idx, trial, trial_seed))
+    arrays = {}
+    if any(job[0] == "relative_directness" for job in jobs):
+        arrays["sm_final"] = metrics.get_shortest_network_path_length_matrix(G)
+    if any(job[0] == "directness" for job in jobs):
+        arrays["em_final"] = metrics.get_euclidean_distance_matrix(G)
+    results = []
+    n_jobs = min(get_n_jobs(n_jobs), max(len(tasks), 1))
+    log.info(f"Running {len(tasks)} trials on {n_jobs} processes.")
+    if n_jobs == 1:
+        _TRIAL_CONTEXT.update(G=G, jobs=jobs, arrays=arrays)
+        try:
+            _collect(map(_run_trial, tasks), sink, results)
+        finally:
+            _TRIAL_CONTEXT.clear()
+        return _sorted_results(results)
+    blocks, specs = _share_arrays(arrays)
+    try:
+        with multiprocessing.Pool(
+            n_jobs, initializer=_init_trial_worker, initargs=(G, jobs, specs)
+        ) as pool:
+            _collect(pool.imap_unordered(_run_trial, tasks), sink, results)
+    finally:
+        for block in blocks.values():
+            block.close()
+            block.unlink()
+    return _sorted_results(results)
+
+
+def _collect(trial_results, sink, results):
+    """Give each result to the sink as soon as it is finished, or keep it if there is no sink."""
+    for result in trial_results:
+        if sink is None:
+            results.append(result)
+        else:
+            sink(result)
+
+
+def _sorted_results(results):
+    return sorted(results, key=lambda result: (result["job"], result["trial"]))
+
+
+def _share_arrays(arrays):
+    """Copy numpy arrays into shared memory blocks, returning the blocks and the specifications to read them from another process."""
+    blocks = {}
+    specs = {}
+    for name, arr in arrays.items():
+        block = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=block.buf)[...] = arr
+        blocks[name] = block
+        specs[name] = (block.name, arr.shape, arr.dtype.str)
+    return blocks, specs
+
+
+def _attach_array(name, shape, dtype):
+    """Read a numpy array from a shared memory block without copying it, the block being owned by the main process."""
+    block = shared_memory.SharedMemory(name=name, track=False)
+    arr = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    arr.flags.writeable = False
+    return block, arr
+
+
+def _init_trial_worker(G, jobs, specs):
+    """Set the graph, the jobs and the shared arrays of a worker process once."""
+    blocks = {}
+    arrays = {}
+    for name, spec in specs.items():
+        blocks[name], arrays[name] = _attach_array(*spec)
+    _TRIAL_CONTEXT.update(G=G, jobs=jobs, arrays=arrays, blocks=blocks)
+
+
+def _run_trial(task):
+    """Run a single trial of a job with its seed."""
+    job_idx, trial, seed = task
+    G = _TRIAL_CONTEXT["G"]
+    strategy, order, kwargs, n_trials = _TRIAL_CONTEXT["jobs"][job_idx]
+    kwargs = dict(kwargs)
+    if callable(strategy) or strategy in RANKING_FUNCS:
+        ranking_func = RANKING_FUNCS.get(strategy, strategy)
+        output = growth.order_ranked_network_growth(
+            G, order=order, ranking_func=ranking_func, seed=seed, **kwargs
+        )
+    else:
+        kwargs.setdefault("progress_bar", False)
+        if strategy == "relative_directness":
+            kwargs.setdefault("sm_final", _TRIAL_CONTEXT["arrays"]["sm_final"])
+        elif strategy == "directness":
+            kwargs.setdefault("em_final", _TRIAL_CONTEXT["arrays"]["em_final"])
+        output = growth.order_dynamic_network_growth(
+            G, order=order, metric=strategy, seed=seed, **kwargs
+        )
+    if kwargs.get("save_metrics", True):
+        metrics_dict, order_growth = output
+    else:
+        metrics_dict, order_growth = None, output
+    kwargs.pop("sm_final", None)
+    kwargs.pop("em_final", None)
+    kwargs.pop("progress_bar", None)
+    return {
+        "job": job_idx,
+        "strategy": strategy if not callable(strategy) else strategy.__name__,
+        "order": order,
+        "kwargs": kwargs,
+        "trial": trial,
+        "n_trials": n_trials,
+        "order_growth": order_growth,
+        "metrics_dict": metrics_dict,
+    }
+
+
+def memoized_trials(G, strategy, order, kwargs, n_trials, seed=None):
+    """
+    Generate the results of the trials of a dynamic growth strategy one after the other, sharing a TieMemo between them. The trials only differ when a tie is broken differently, so the metric is only computed for the steps after a new choice at a tie. If the first trial found no tie, the growth is deterministic and the remaining trials, identical to the first one, are not run. The trials have the same seeds as the trials of a single job with this seed in run_trials.
+
+    Args:
+        G (networkx.Graph): Final graph.
+        strategy (str): Name of a metric for growth.order_dynamic_network_growth.
+        order (str): Either subtractive or additive.
+        kwargs (dict): Arguments given to growth.order_dynamic_network_growth.
+        n_trials (int): Number of trials.
+        seed (int or numpy.random.SeedSequence, optional): Seed of all the trials. Defaults to None.
+
+    Yields:
+        dict: Result of each trial, as in run_trials, with "deterministic" True if it is a copy of the first trial.
+    """
+    memo = TieMemo()
+    kwargs = dict(kwargs)
+    kwargs.setdefault("progress_bar", False)
+    result = None
+    # Seeds of the trials of the only job of run_trials
+    trial_seeds = spawn_seeds(spawn_seeds(seed, 1)[0], n_trials)
+    for trial, trial_seed in enumerate(trial_seeds):
+        if result is not None and memo.num_ties == 0:
+            log.info(
+                f"No tie found, skipping the {n_trials - trial} remaining trials identical to the first one."
+            )
+            for other in range(trial, n_trials):
+                yield dict(result, trial=other, deterministic=True)
+            return
+        output = growth.order_dynamic_network_growth(
+            G, order=order, metric=strategy, seed=trial_seed, memo=memo, **kwargs
+        )
+        if kwargs.get("save_metrics", True):
+            metrics_dict, order_growth = output
+        else:
+            metrics_dict, order_growth = None, output
+        result = {
+            "job": 0,
+            "strategy": strategy,
+            "order": order,
+            "kwargs": {
+                key: val for key, val in kwargs.items() if key != "progress_bar"
+            },
+            "trial": trial,
+            "n_trials": n_trials,
+            "order_growth": order_growth,
+            "metrics_dict": metrics_dict,
+            "deterministic": False,
+        }
+        yield result
+    log.info(
+        f"{memo.num_ties} ties found, {memo.num_hits} out of {memo.num_hits + memo.num_misses} steps read from the memo."
+    )
+
+
+class TieMemo:
+    """
+    Memo of the optimal edges of each step of dynamic growths of the same graph with the same arguments, only differing by the seed breaking the ties. It is a tree whose nodes are the prefixes of the orders of growth, each keeping the optimal edges for the next step, so that a trial following a known prefix doesn't need to compute the metric and only branches at ties.
+    """
+
+    def __init__(self):
+        self.root = {}
+        self.num_ties = 0
+        self.num_hits = 0
+        self.num_misses = 0
+
+    def optimum(self, node):
+        """Return the optimal edges of the step after the prefix of node, None if not known yet."""
+        if "optimum" in node:
+            self.num_hits += 1
+            return node["optimum"]
+        self.num_misses += 1
+        return None
+
+    def record(self, node, optimum):
+        """Keep the optimal edges of the step after the prefix of node."""
+        node["optimum"] = optimum
+        if len(optimum) > 1:
+            self.num_ties += 1
+
+    def child(self, node, step):
+        """Return the node of the prefix of node followed by step, creating it if needed."""
+        return node.setdefault("children", {}).setdefault(tuple(step), {})
+
+
+class JSONFolderSink:
+    """
+    Sink for run_trials saving the order of growth and the metrics of each trial as JSON files, with the same folders as the scripts: one folder for each strategy and order, with "_connected" and "_built" suffixes if keep_connected and built are True.
+
+    Args:
+        folderoots (str): Folder where to create the folders of the strategies.
+    """
+
+    def __init__(self, folderoots):
+        self.folderoots = folderoots
+
+    def __call__(self, result):
+        kwargs = result["kwargs"]
+        foldername = os.path.join(
+            self.folderoots, result["strategy"] + "_" + result["order"]
+        )
+        if kwargs.get("keep_connected", True):
+            foldername += "_connected"
+        if kwargs.get("built", True):
+            foldername += "_built"
+        if not os.path.exists(foldername):
+            os.makedirs(foldername, exist_ok=True)
+        pad = len(str(result["n_trials"] - 1))
+        trial = result["trial"]
+        with open(foldername + f"/order_growth_{trial:0{pad}}.json", "w") as f:
+            json.dump(result["order_growth"], f)
+        if result["metrics_dict"] is not None:
+            with open(foldername + f"/metrics_growth_{trial:0{pad}}.json", "w") as f:
+                json.dump(result["metrics_dict"], f)
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Classes to maintain the union of the buffered geometries of the edges during the growth instead of computing it again for each tested graph.
+"""
+
+import numpy as np
+import shapely
+
+
+class UnionTree:
+    """
+    Balanced binary tree of partial unions of geometries, each node being the union of its two children and the root the union of all geometries. The geometries are ordered by recursive median splits of their centroids, so that each node covers a compact part of the space. The union of all geometries but one is the union of the siblings of the nodes on the path from its leaf to the root, and removing a geometry only computes again the unions on this path.
+
+    Args:
+        geoms (dict): Dictionary of the geometries, with the edges as keys.
+    """
+
+    def __init__(self, geoms):
+        keys = list(geoms)
+        centroids = shapely.get_coordinates(
+            shapely.centroid([geoms[key] for key in keys])
+        )
+        order = _median_split_order(centroids, np.arange(len(keys)))
+        self.num_leaves = 1 << max(len(keys) - 1, 0).bit_length()
+        self.position = {keys[idx]: pos for pos, idx in enumerate(order)}
+        self.nodes = [None] * (2 * self.num_leaves)
+        for key, pos in self.position.items():
+            self.nodes[self.num_leaves + pos] = geoms[key]
+        for node in range(self.num_leaves - 1, 0, -1):
+            self.nodes[node] = _union(self.nodes[2 * node], self.nodes[2 * node + 1])
+        self.area = self._root_area()
+
+    def _root_area(self):
+        return self.nodes[1].area if self.nodes[1] is not None else 0
+
+    def exclusive_area(self, key):
+        """Return the area of the geometry of key not covered by any other geometry, so that the area of the union without it is UnionTree.area minus this area."""
+        node = self.num_leaves + self.position[key]
+        geom = self.nodes[node]
+        parts = []
+        while node > 1:
+            sibling = self.nodes[node ^ 1]
+            if sibling is not None and shapely.intersects(
+                shapely.envelope(geom), shapely.envelope(sibling)
+            ):
+                parts.append(shapely.intersection(geom, sibling))
+            node >>= 1
+        if not parts:
+            return geom.area
+        return geom.area - shapely.union_all(parts).area
+
+    def remove(self, key):
+        """Remove the geometry of key, computing again the unions on the path from its leaf to the root."""
+        node = self.num_leaves + self.position.pop(key)
+        self.nodes[node] = None
+        node >>= 1
+        while node >= 1:
+            self.nodes[node] = _union(self.nodes[2 * node], self.nodes[2 * node + 1])
+            node >>= 1
+        self.area = self._root_area()
+
+
+def _union(first, second):
+    """Union of two geometries, either of them being None if empty."""
+    if first is None:
+        return second
+    if second is None:
+        return first
+    return shapely.union(first, second)
+
+
+def _median_split_order(points, ids):
+    """Order the ids by splitting recursively the points at the median of the axis with the largest extent."""
+    if len(ids) <= 1:
+        return list(ids)
+    coords = points[ids]
+    axis = np.argmax(coords.max(axis=0) - coords.min(axis=0))
+    ids = ids[np.argsort(coords[:, axis], kind="stable")]
+    half = len(ids) // 2
+    return _median_split_order(points, ids[:half]) + _median_split_order(
+        points, ids[half:]
+    )
+
+
+class BufferUnion:
+    """
+    Union of the buffered edges of a graph during an additive growth, adding the buffer of each step to the union. The buffers of all edges of the final graph are computed once, so that they can be kept to replay multiple growths with BufferUnion.reset.
+
+    Args:
+        buffers (buffers.EdgeBuffers): Buffers of the edges of the final graph.
+        edges (list, optional): Edges added at the start. Defaults to ().
+    """
+
+    def __init__(self, buffers, edges=()):
+        self.buffers = buffers
+        self.reset(edges)
+
+    @property
+    def area(self):
+        """Area of the union of the buffers of the added edges."""
+        return self.union.area if self.union is not None else 0
+
+    def reset(self, edges=()):
+        """Remove all edges, then add the edges."""
+        self.union = shapely.union_all(self.buffers.get(edges)) if edges else None
+
+    def add(self, edge):
+        """Add the buffer of edge to the union."""
+        self.union = _union(self.union, self.buffers.get([edge])[0])
+
+    def extend(self, edges):
+        """Add the buffers of the edges to the union, with a single union with the union of their buffers."""
+        if edges:
+            self.union = _union(self.union, shapely.union_all(self.buffers.get(edges)))
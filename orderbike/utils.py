@@ -19,19 +19,16 @@ import os
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 LOG_PATH = os.path.join(PROJECT_ROOT, "growth.log")
 
-# Root logger that is then used in functions in growth and metrics. Comment filename to avoid saving results, change level to keep only some messages.
-logging.basicConfig(
-    filename=LOG_PATH,
-    level=logging.DEBUG,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
-log = logging.getLogger()
+# Logger of the package used in functions in growth and metrics. Without handler only warnings are printed, use log_to_file to save all messages.
+log = logging.getLogger("orderbike")
 
 
 __all__ = [
     "get_auc",
     "multidigraph_to_graph",
     "add_edge_attr_from_dict",
+    "spawn_seeds",
+    "log_to_file",
 ]
 
 
@@ -45,7 +42,11 @@ def get_auc(
     exp_discounting=True,
     exp_gap=10,
 ):
-    """Get area under the curve to compare the efficiency of a curve"""
+    """Get area under the curve to compare the efficiency of a curve. Points with a NaN value, such as the steps not sampled by growth.compute_metrics with sample_every or sample_length, are removed, the curve being linearly interpolated between the remaining points."""
+    xx = np.asarray(xx, dtype=float)
+    yy = np.asarray(yy, dtype=float)
+    known = ~np.isnan(yy)
+    xx, yy = xx[known], yy[known]
     if normalize_x:
         xx = (np.array(xx) - np.min(xx)) / (np.max(xx) - np.min(xx))
     if normalize_y:
@@ -82,6 +83,31 @@ def auc_from_metrics_dict(met_dict, met, **kwargs):
     return get_auc(xx, yy, **kwargs)
 
 
+def spawn_seeds(seed, num_trials):
+    """
+    Get independent seeds for multiple trials of a growth from a single seed. The seed of a trial only depends on the seed and the index of the trial, so trials split between multiple processes give the same results as trials run one after the other.
+
+    Args:
+        seed (int or numpy.random.SeedSequence): Seed of all the trials. If None, use fresh entropy from the operating system.
+        num_trials (int): Number of trials.
+
+    Returns:
+        list: List of numpy.random.SeedSequence, to give as seed to the growth functions.
+    """
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return seed.spawn(num_trials)
+
+
+def log_to_file(filename=LOG_PATH, level=logging.DEBUG):
+    """Save the messages of the package with at least the level in filename, growth.log in the project folder by default."""
+    handler = logging.FileHandler(filename)
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    log.addHandler(handler)
+    log.setLevel(level)
+    return handler
+
+
 def dist(v1, v2):
     """
     From https://github.com/mszell/bikenwgrowth
@@ -9,7 +9,7 @@ import json
 from utg import create_graph
 from utg import utils as utgut
 from orderbike import growth, metrics
-from orderbike.utils import log
+from orderbike.utils import log, log_to_file
 from orderbike.plot import plot_graph
 import pathlib
 
@@ -30,6 +30,7 @@ def find_last_trial(folder):
 
 
 if __name__ == "__main__":
+    log_to_file()
     BUILT = False
     CONNECTED = True
     ranking_func = {}
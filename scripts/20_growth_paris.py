@@ -6,11 +6,12 @@ Script to find growth order on the toy graphs, with all growth strategies, dynam
 import os
 import json
 from orderbike import growth, metrics
-from orderbike.utils import log
+from orderbike.utils import log, log_to_file
 import osmnx as ox
 
 
 if __name__ == "__main__":
+    log_to_file()
     CONNECTED = True
     ranking_func = {}
     ranking_func["closeness"] = metrics.growth_closeness